@@ -39,6 +39,11 @@ class CollectionResponse(BaseModel):
     total: int
 
 
+class DeleteCollectionsRequest(BaseModel):
+    """Request para deletar várias collections"""
+    collections: List[str]
+
+
 # NÃO instanciar globalmente - criar com db session
 
 
@@ -285,6 +290,7 @@ async def list_collections():
         Lista de collections
     """
     try:
+        ingestion_service = PortalIngestionService()
         collections = ingestion_service.list_collections()
         
         return CollectionResponse(
@@ -313,7 +319,6 @@ async def list_processed_packages(
     """
     try:
         from app.models.portal_ingestion_job import PortalIngestionJob
-        import json
         
         query = db.query(PortalIngestionJob).filter(
             PortalIngestionJob.status == "completed"
@@ -329,7 +334,7 @@ async def list_processed_packages(
         
         for job in jobs:
             try:
-                packages_list = json.loads(job.packages)
+                packages_list = job.packages or []
                 
                 for package_name in packages_list:
                     # Guardar apenas o mais recente de cada package
@@ -366,6 +371,7 @@ async def delete_collection(collection_name: str):
         Resultado da operação
     """
     try:
+        ingestion_service = PortalIngestionService()
         success = ingestion_service.delete_collection(collection_name)
         
         if not success:
@@ -387,6 +393,34 @@ async def delete_collection(collection_name: str):
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@router.post("/collections/delete")
+async def delete_collections(request: DeleteCollectionsRequest):
+    """
+    Deleta várias collections do ChromaDB em uma única chamada
+    
+    Args:
+        request: Nomes das collections
+        
+    Returns:
+        Collections deletadas e as que falharam
+    """
+    try:
+        ingestion_service = PortalIngestionService()
+        result = ingestion_service.delete_collections(request.collections)
+        
+        return {
+            **result,
+            "success": not result["failed"]
+        }
+        
+    except Exception as e:
+        logger.error(
+            f"Error deleting collections",
+            error=str(e)
+        )
+        raise HTTPException(status_code=500, detail=str(e))
+
+
 @router.get("/jobs")
 async def list_jobs(
     municipality_id: str = None,
@@ -408,7 +442,6 @@ async def list_jobs(
     """
     try:
         from app.models.portal_ingestion_job import PortalIngestionJob
-        import json
         
         query = db.query(PortalIngestionJob)
         
@@ -425,12 +458,7 @@ async def list_jobs(
         for job in jobs:
             job_dict = job.to_dict()
             
-            # Parse packages JSON
-            try:
-                packages_list = json.loads(job.packages)
-                job_dict['packages_list'] = packages_list
-            except:
-                job_dict['packages_list'] = []
+            job_dict['packages_list'] = job.packages or []
             
             jobs_data.append(job_dict)
         
@@ -24,6 +24,8 @@ else:
     engine = create_engine(
         settings.DATABASE_URL,
         pool_pre_ping=True,
+        # Cache de statements compilados (polling de status reutiliza as mesmas queries)
+        query_cache_size=1200,
         echo=settings.DEBUG
     )
 
@@ -74,6 +74,20 @@ async def lifespan(app: FastAPI):
     except Exception as e:
         logger.warning(f"Redis connection check failed: {e}")
     
+    # Diagnóstico do hash usado na deduplicação de raw files
+    try:
+        from app.services.raw_file_service import measure_sha256_throughput
+        hash_info = measure_sha256_throughput()
+        if hash_info["hardware_accelerated"]:
+            logger.info("SHA-256 throughput", **hash_info)
+        else:
+            logger.warning(
+                "SHA-256 throughput below expected; OpenSSL may lack SHA-NI acceleration",
+                **hash_info
+            )
+    except Exception as e:
+        logger.warning(f"SHA-256 benchmark failed: {e}")
+    
     logger.info("Application startup complete")
     logger.info(f"API docs available at: http://localhost:{settings.BACKEND_PORT}/docs")
     
@@ -2,7 +2,7 @@
 Model para FileSchema - Schema descoberto de arquivos
 """
 
-from sqlalchemy import Column, String, Integer, DateTime, JSON, ForeignKey, Text
+from sqlalchemy import Column, String, Integer, Float, DateTime, JSON, ForeignKey, Text, Index, text
 from sqlalchemy.orm import relationship
 from datetime import datetime
 import uuid
@@ -47,6 +47,10 @@ class FileSchema(Base):
     #   ...
     # ]
     
+    # Hash do cabeçalho (permite reutilizar schema de arquivos com o mesmo layout).
+    # Único apenas entre schemas ativos (ver __table_args__)
+    header_hash = Column(String(128), nullable=True)
+    
     # Estatísticas
     total_rows = Column(Integer, nullable=True)
     total_columns = Column(Integer, nullable=False)
@@ -69,7 +73,16 @@ class FileSchema(Base):
     # 'active' | 'outdated' | 'deprecated'
     
     # Relationships
-    raw_file = relationship("RawFile")
+    raw_file = relationship("RawFile", foreign_keys=[raw_file_id])
+    
+    __table_args__ = (
+        Index(
+            "ix_file_schemas_header_hash",
+            "header_hash",
+            unique=True,
+            postgresql_where=text("status = 'active'")
+        ),
+    )
     
     def __repr__(self):
         return f"<FileSchema(filename='{self.filename}', columns={self.total_columns})>"
@@ -185,11 +198,16 @@ class SchemaAlias(Base):
     # 'exact' | 'normalized' | 'semantic' | 'fuzzy'
     
     # Confiança do match (0.0 a 1.0)
-    confidence = Column(String(10), nullable=False, default="1.0")
+    confidence = Column(Float, nullable=False, default=1.0)
     
     # Timestamps
     created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
     
+    # Busca por alias (já gravado em lowercase), opcionalmente filtrada por schema
+    __table_args__ = (
+        Index('idx_schema_alias_lookup', 'alias', 'file_schema_id'),
+    )
+    
     def __repr__(self):
         return f"<SchemaAlias(alias='{self.alias}' → '{self.original_column_name}')>"
 
@@ -1,7 +1,7 @@
 """
 Modelo para Jobs de Ingestão do Portal da Transparência
 """
-from sqlalchemy import Column, String, Integer, DateTime, Text, BigInteger
+from sqlalchemy import Column, String, Integer, DateTime, Text, BigInteger, JSON
 from datetime import datetime
 from app.core.database import Base
 import uuid
@@ -19,7 +19,7 @@ class PortalIngestionJob(Base):
     
     id = Column(String, primary_key=True, default=generate_uuid)
     municipality_id = Column(String, nullable=False, index=True)
-    packages = Column(Text, nullable=False)  # JSON array de package names
+    packages = Column(JSON, nullable=False)  # Lista de package names
     status = Column(String(20), nullable=False, default="pending", index=True)
     # Status: 'pending', 'processing', 'completed', 'failed', 'cancelled'
     
@@ -3,14 +3,27 @@ Model para RawFile - Armazena arquivo original (source of truth)
 """
 
 from sqlalchemy import Column, String, Integer, BigInteger, DateTime, Text, LargeBinary, ForeignKey, JSON
-from sqlalchemy.orm import relationship
+from sqlalchemy.orm import deferred, relationship
 from datetime import datetime
+import os
 import uuid
 import hashlib
+from contextlib import nullcontext
+from typing import BinaryIO, Optional, Tuple
 
 from app.core.database import Base
 
 
+# Tamanho do bloco usado no cálculo conjunto de hashes
+HASH_CHUNK_SIZE = 64 * 1024
+
+# Tamanho do bloco lido de streams/arquivos grandes
+STREAM_CHUNK_SIZE = 1024 * 1024
+
+# Bytes do início/fim do arquivo usados no fingerprint rápido
+FAST_FP_EDGE_SIZE = 64 * 1024
+
+
 def generate_uuid():
     return str(uuid.uuid4())
 
@@ -40,7 +53,9 @@ class RawFile(Base):
     mime_type = Column(String(100), nullable=True)
     
     # Conteúdo (para arquivos pequenos < 10MB)
-    file_content = Column(LargeBinary, nullable=True)
+    # Deferred: consultas de metadados/deduplicação não trazem o blob;
+    # ele só é carregado quando o atributo é acessado
+    file_content = deferred(Column(LargeBinary, nullable=True))
     
     # Para arquivos grandes, caminho no filesystem/S3
     file_path = Column(String(1000), nullable=True)
@@ -53,6 +68,17 @@ class RawFile(Base):
     
     md5_hash = Column(String(32), nullable=True)
     
+    # Fingerprint rápido (início + fim + tamanho) para deduplicar sem hash completo
+    fast_fp = Column(BigInteger, nullable=True, index=True)
+    
+    # Schema associado (compartilhado entre arquivos com o mesmo cabeçalho)
+    file_schema_id = Column(
+        String,
+        ForeignKey("file_schemas.id", use_alter=True, name="fk_raw_files_file_schema_id"),
+        nullable=True,
+        index=True
+    )
+    
     # Metadados adicionais
     extra_metadata = Column(JSON, nullable=True)
     # Ex: {"url": "...", "download_date": "...", "package_name": "..."}
@@ -73,7 +99,12 @@ class RawFile(Base):
     
     @staticmethod
     def calculate_sha256(content: bytes) -> str:
-        """Calcula hash SHA256 do conteúdo"""
+        """
+        Calcula hash SHA256 do conteúdo
+        
+        Uma única chamada sobre o buffer inteiro: o OpenSSL processa tudo no
+        caminho acelerado (SHA-NI, quando disponível).
+        """
         return hashlib.sha256(content).hexdigest()
     
     @staticmethod
@@ -81,6 +112,98 @@ class RawFile(Base):
         """Calcula hash MD5 do conteúdo"""
         return hashlib.md5(content).hexdigest()
     
+    @staticmethod
+    def calculate_fast_fp(content: bytes) -> int:
+        """
+        Fingerprint barato do conteúdo: BLAKE2b (64 bits) dos primeiros e
+        últimos 64KB mais o tamanho. Serve apenas como pré-filtro de
+        deduplicação; colisões são resolvidas comparando o conteúdo.
+        """
+        return RawFile._fast_fp(
+            len(content),
+            content[:FAST_FP_EDGE_SIZE],
+            content[-FAST_FP_EDGE_SIZE:]
+        )
+    
+    @staticmethod
+    def calculate_fast_fp_from_file(path: str) -> int:
+        """Mesmo fingerprint de calculate_fast_fp, lendo apenas início e fim do arquivo"""
+        size = os.path.getsize(path)
+        with open(path, 'rb') as f:
+            head = f.read(FAST_FP_EDGE_SIZE)
+            f.seek(max(size - FAST_FP_EDGE_SIZE, 0))
+            tail = f.read(FAST_FP_EDGE_SIZE)
+        return RawFile._fast_fp(size, head, tail)
+    
+    @staticmethod
+    def _fast_fp(size: int, head: bytes, tail: bytes) -> int:
+        digest = hashlib.blake2b(digest_size=8)
+        digest.update(size.to_bytes(8, "big"))
+        digest.update(head)
+        digest.update(tail)
+        # Inteiro com sinal para caber em BIGINT
+        return int.from_bytes(digest.digest(), "big", signed=True)
+    
+    @staticmethod
+    def calculate_hashes(content: bytes, compute_md5: bool = True) -> Tuple[str, Optional[str]]:
+        """
+        Calcula SHA256 e MD5 em uma única passada pelo conteúdo
+        
+        O conteúdo é percorrido em blocos de 64KB, alimentando os dois hashes
+        com cada bloco enquanto ele ainda está no cache da CPU.
+        
+        Args:
+            content: Conteúdo do arquivo
+            compute_md5: Se False, calcula só o SHA256 (md5 retorna None)
+        
+        Returns:
+            (sha256, md5) em hexadecimal
+        """
+        if not compute_md5:
+            return RawFile.calculate_sha256(content), None
+        
+        sha256 = hashlib.sha256()
+        md5 = hashlib.md5()
+        view = memoryview(content).cast('B')
+        
+        for start in range(0, len(view), HASH_CHUNK_SIZE):
+            chunk = view[start:start + HASH_CHUNK_SIZE]
+            sha256.update(chunk)
+            md5.update(chunk)
+        
+        return sha256.hexdigest(), md5.hexdigest()
+    
+    @staticmethod
+    def calculate_hashes_from_stream(
+        stream: BinaryIO,
+        copy_to: Optional[str] = None,
+        compute_md5: bool = True
+    ) -> Tuple[str, Optional[str], int]:
+        """
+        Calcula SHA256 e MD5 lendo o stream em blocos de 1MB
+        
+        Se copy_to for informado, cada bloco também é gravado nesse caminho,
+        de modo que o arquivo é copiado para o destino na mesma passada.
+        Com compute_md5=False só o SHA256 é calculado (md5 retorna None).
+        
+        Returns:
+            (sha256, md5, tamanho em bytes)
+        """
+        sha256 = hashlib.sha256()
+        md5 = hashlib.md5() if compute_md5 else None
+        size = 0
+        
+        with (open(copy_to, 'wb') if copy_to else nullcontext()) as dest:
+            for chunk in iter(lambda: stream.read(STREAM_CHUNK_SIZE), b""):
+                sha256.update(chunk)
+                if md5:
+                    md5.update(chunk)
+                size += len(chunk)
+                if dest:
+                    dest.write(chunk)
+        
+        return sha256.hexdigest(), md5.hexdigest() if md5 else None, size
+    
     def __repr__(self):
         return f"<RawFile(filename='{self.filename}', format='{self.file_format}', hash='{self.sha256_hash[:8]}...')>"
     
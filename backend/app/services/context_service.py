@@ -11,6 +11,7 @@ from sqlalchemy.orm import Session
 
 from app.services.vector_db import VectorDBService
 from app.services.embedding_service import EmbeddingService
+from app.services.prompt_builder import PromptBuilder
 from app.core.config import settings
 from app.core.database import SessionLocal
 from app.models.document import Document
@@ -123,6 +124,7 @@ class ContextService:
                         if similarity >= min_similarity:
                             context = {
                                 "content": doc_text,
+                                "preview": doc_text[:PromptBuilder.CONTENT_PREVIEW_CHARS],
                                 "similarity": round(similarity, 3),
                                 "metadata": metadatas[i] if i < len(metadatas) else {},
                                 "source": "LOA",
@@ -200,6 +202,7 @@ class ContextService:
                         if similarity >= min_similarity:
                             context = {
                                 "content": doc_text,
+                                "preview": doc_text[:PromptBuilder.CONTENT_PREVIEW_CHARS],
                                 "similarity": round(similarity, 3),
                                 "metadata": metadatas[i] if i < len(metadatas) else {},
                                 "source": "LDO",
@@ -6,7 +6,7 @@ import logging
 from typing import Optional, Dict, Any, List
 from datetime import datetime
 from sqlalchemy.orm import Session
-from sqlalchemy import and_, or_
+from sqlalchemy import and_, or_, update
 
 from app.models.data_lineage import DataLineage
 from app.models.raw_file import RawFile
@@ -25,6 +25,10 @@ class DataLineageService:
     
     def __init__(self, db: Session):
         self.db = db
+        # Conclusões registradas com defer_commit=True aguardando flush_completions().
+        # Guardadas como valores simples (não como objetos ORM sujos) para que um
+        # rollback feito por outro serviço na mesma sessão não as descarte.
+        self._pending_completions: List[Dict[str, Any]] = []
     
     def start_operation(
         self,
@@ -69,7 +73,8 @@ class DataLineageService:
         lineage: DataLineage,
         result: Optional[Dict[str, Any]] = None,
         embedding_model: Optional[str] = None,
-        embedding_dimensions: Optional[str] = None
+        embedding_dimensions: Optional[str] = None,
+        defer_commit: bool = False
     ):
         """
         Marca operação como completa
@@ -79,24 +84,52 @@ class DataLineageService:
             result: Resultado da operação
             embedding_model: Modelo usado (se aplicável)
             embedding_dimensions: Dimensões do embedding (se aplicável)
+            defer_commit: Não faz commit agora; a conclusão é gravada junto
+                com as demais em flush_completions()
         """
-        lineage.status = "completed"
-        lineage.completed_at = datetime.utcnow()
+        values: Dict[str, Any] = {
+            "status": "completed",
+            "completed_at": datetime.utcnow()
+        }
         
         if result:
-            lineage.result = result
+            values["result"] = result
         
         if embedding_model:
-            lineage.embedding_model = embedding_model
+            values["embedding_model"] = embedding_model
         
         if embedding_dimensions:
-            lineage.embedding_dimensions = embedding_dimensions
+            values["embedding_dimensions"] = embedding_dimensions
         
-        self.db.commit()
+        if defer_commit:
+            self._pending_completions.append({"id": lineage.id, **values})
+        else:
+            for key, value in values.items():
+                setattr(lineage, key, value)
+            self.db.commit()
         
-        duration = lineage.calculate_duration_seconds()
+        duration = (values["completed_at"] - lineage.started_at).total_seconds()
         logger.info(f"✅ Lineage completed: {lineage.operation} ({duration:.2f}s)")
     
+    def flush_completions(self) -> int:
+        """
+        Grava em uma única transação as conclusões adiadas
+        
+        Returns:
+            Número de operações gravadas
+        """
+        count = len(self._pending_completions)
+        if not count:
+            return 0
+        
+        # UPDATE em lote por chave primária (uma linha por conclusão)
+        self.db.execute(update(DataLineage), self._pending_completions)
+        self.db.commit()
+        self._pending_completions.clear()
+        
+        logger.info(f"📝 Flushed {count} lineage completions")
+        return count
+    
     def fail_operation(
         self,
         lineage: DataLineage,
@@ -111,6 +144,13 @@ class DataLineageService:
             error_message: Mensagem de erro
             error_traceback: Traceback do erro
         """
+        # Descartar conclusão adiada da mesma operação: o flush no fim do job
+        # sobrescreveria a falha com "completed"
+        self._pending_completions = [
+            pending for pending in self._pending_completions
+            if pending["id"] != lineage.id
+        ]
+        
         lineage.status = "failed"
         lineage.completed_at = datetime.utcnow()
         lineage.error_message = error_message
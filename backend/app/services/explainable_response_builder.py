@@ -3,7 +3,9 @@ Serviço de Construção de Respostas Explicáveis (Fase 3)
 Gera respostas com citações verificáveis e rastreáveis
 """
 
+import asyncio
 import logging
+from concurrent.futures import ThreadPoolExecutor
 from typing import Dict, Any, List, Optional
 import google.generativeai as genai
 
@@ -13,6 +15,9 @@ from app.services.query_planner_service import QueryPlan
 
 logger = logging.getLogger(__name__)
 
+# Pool compartilhado para as chamadas bloqueantes ao Gemini (dimensionado pela cota de QPS)
+_GEMINI_EXEC = ThreadPoolExecutor(max_workers=8, thread_name_prefix="gemini")
+
 
 class Citation:
     """Representa uma citação verificável"""
@@ -245,9 +250,14 @@ IMPORTANTE:
 
 Responda:"""
         
-        response = self.model.generate_content(
-            prompt,
-            generation_config=genai.GenerationConfig(temperature=0.2)
+        # Chamada síncrona ao Gemini em pool compartilhado, sem bloquear o event loop
+        loop = asyncio.get_running_loop()
+        response = await loop.run_in_executor(
+            _GEMINI_EXEC,
+            lambda: self.model.generate_content(
+                prompt,
+                generation_config=genai.GenerationConfig(temperature=0.2)
+            )
         )
         
         return response.text
@@ -497,12 +497,7 @@ Posso consultar apenas dados do Portal da Transparência, sem cruzamento com LOA
         """
         try:
             # Listar todas as collections do portal
-            all_collections = self.vector_db.list_collections()
-            # all_collections já é uma lista de strings (nomes)
-            portal_collections = [
-                c for c in all_collections
-                if c.startswith("portal_")
-            ]
+            portal_collections = self.vector_db.list_collections(prefix="portal_")
             
             if not portal_collections:
                 logger.info("Nenhuma collection do Portal encontrada")
@@ -570,6 +565,7 @@ Posso consultar apenas dados do Portal da Transparência, sem cruzamento com LOA
                             
                             results.append({
                                 "text": doc,
+                                "preview": doc[:PromptBuilder.TEXT_PREVIEW_CHARS],
                                 "source": collection_name,
                                 "metadata": metadata,
                                 "similarity": adjusted_similarity
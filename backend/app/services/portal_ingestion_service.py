@@ -1,13 +1,19 @@
 """
 Serviço de Ingestão de Packages do Portal da Transparência
 """
+import asyncio
 import httpx
 import json
-from typing import List, Dict, Any, Optional
+import os
+import threading
+import time
+from typing import List, Dict, Any, Optional, Tuple
 from datetime import datetime
+from sqlalchemy import bindparam, func, insert, select
 from sqlalchemy.orm import Session
 import structlog
 import traceback
+from collections import deque
 
 from app.services.portal_client import PortalTransparenciaClient, get_portal_client
 from app.services.resource_parser import ResourceParser
@@ -18,12 +24,23 @@ from app.services.data_lineage_service import DataLineageService
 from app.services.schema_discovery_service import SchemaDiscoveryService
 from app.models.portal_ingestion_job import PortalIngestionJob
 from app.models.raw_file import RawFile
-from app.models.parsed_data import ParsedData
+from app.models.parsed_data import ParsedData, generate_uuid
 from app.core.config import settings
 from app.schemas.metadata_schemas import MetadataExtractor, MetadataValidator
 
 logger = structlog.get_logger(__name__)
 
+# Statement reutilizado no polling de status (compilado uma única vez)
+_JOB_BY_ID_STMT = select(PortalIngestionJob).where(PortalIngestionJob.id == bindparam("jid"))
+
+# Colunas de parsed_data gravadas via COPY (na ordem do buffer)
+PARSED_DATA_COPY_COLUMNS = (
+    "id", "raw_file_id", "row_number", "data", "data_normalized", "text_content", "parsed_at"
+)
+_PARSED_DATA_COPY_SQL = (
+    f"COPY {ParsedData.__tablename__} ({', '.join(PARSED_DATA_COPY_COLUMNS)}) FROM STDIN"
+)
+
 
 class PortalIngestionService:
     """
@@ -31,6 +48,17 @@ class PortalIngestionService:
     COM AUDITABILIDADE COMPLETA (Fase 1)
     """
     
+    # Cache das collections do Portal (compartilhado entre instâncias,
+    # já que o serviço é criado a cada request)
+    COLLECTIONS_CACHE_TTL = 10  # segundos
+    _collections_cache: Optional[Tuple[float, List[str]]] = None
+    
+    # Número de workers concorrentes inserindo batches no ChromaDB
+    CHROMADB_INSERT_WORKERS = 2
+    
+    # Intervalo mínimo entre atualizações intermediárias do arquivo de progresso
+    PROGRESS_WRITE_INTERVAL = 0.5  # segundos
+    
     def __init__(self, db: Session = None):
         self.portal_client = get_portal_client()
         self.parser = ResourceParser()
@@ -45,6 +73,68 @@ class PortalIngestionService:
             
             # SERVIÇOS DE ELASTICIDADE (Fase 2)
             self.schema_discovery_service = SchemaDiscoveryService(db)
+        
+        # Último conteúdo/instante escrito no arquivo de progresso (evita escritas repetidas)
+        self._last_progress_payload = None
+        self._last_progress_write = 0.0
+        # Embeddings e inserções atualizam o progresso a partir de threads distintas
+        self._progress_lock = threading.Lock()
+    
+    def _write_progress_file(self, progress_file: str, payload: str, force: bool = False) -> None:
+        """
+        Escreve o arquivo de progresso de forma atômica
+        
+        Escreve em um arquivo temporário e renomeia com os.replace, para que
+        leitores concorrentes nunca vejam o arquivo vazio ou pela metade.
+        Ignora escritas cujo conteúdo é igual ao último escrito e limita as
+        atualizações intermediárias a uma a cada PROGRESS_WRITE_INTERVAL
+        segundos (force=True sempre escreve, para marcos como início/fim).
+        """
+        with self._progress_lock:
+            if payload == self._last_progress_payload:
+                return
+            
+            now = time.monotonic()
+            if not force and now - self._last_progress_write < self.PROGRESS_WRITE_INTERVAL:
+                return
+            
+            tmp_file = progress_file + ".tmp"
+            with open(tmp_file, 'w') as f:
+                f.write(payload)
+            os.replace(tmp_file, progress_file)
+            
+            self._last_progress_payload = payload
+            self._last_progress_write = now
+    
+    def _insert_parsed_data(self, rows: List[Dict[str, Any]]) -> None:
+        """
+        Insere as linhas de parsed_data em lote, na transação da sessão
+        
+        No PostgreSQL (psycopg2) usa COPY ... FROM STDIN; nos demais bancos,
+        um único INSERT executemany. Os IDs já vêm preenchidos em rows.
+        """
+        if not rows:
+            return
+        
+        if self.db.get_bind().dialect.name == "postgresql":
+            cursor = self.db.connection().connection.cursor()
+            try:
+                if hasattr(cursor, "copy_expert"):
+                    buffer = ResourceParser.build_copy_buffer(
+                        [row[column] for column in PARSED_DATA_COPY_COLUMNS]
+                        for row in rows
+                    )
+                    cursor.copy_expert(_PARSED_DATA_COPY_SQL, buffer)
+                    return
+            finally:
+                cursor.close()
+        
+        self.db.execute(insert(ParsedData), rows)
+    
+    def flush_lineage(self) -> None:
+        """Grava de uma vez as conclusões de lineage adiadas durante o job."""
+        if self.db:
+            self.lineage_service.flush_completions()
     
     async def start_ingestion(
         self,
@@ -66,7 +156,7 @@ class PortalIngestionService:
         # Criar job
         job = PortalIngestionJob(
             municipality_id=municipality_id,
-            packages=json.dumps(package_names),
+            packages=package_names,
             status="pending",
             total_packages=len(package_names)
         )
@@ -98,8 +188,7 @@ class PortalIngestionService:
         progress_file = f"/tmp/ingest_progress_{job_id}.txt"
         
         try:
-            with open(progress_file, 'w') as f:
-                f.write("0/0|Iniciando processamento...|0")
+            self._write_progress_file(progress_file, "0/0|Iniciando processamento...|0", force=True)
             logger.info(f"Progress file created: {progress_file}")
         except Exception as e:
             logger.error(f"Failed to create progress file: {e}")
@@ -118,8 +207,8 @@ class PortalIngestionService:
         db.commit()
         
         try:
-            # Parse da lista de packages
-            package_names = json.loads(job.packages)
+            # Lista de packages (coluna JSON já desserializada pelo driver)
+            package_names = job.packages
             
             results = {
                 "job_id": job_id,
@@ -139,8 +228,11 @@ class PortalIngestionService:
                     
                     # Escrever progresso em arquivo
                     try:
-                        with open(progress_file, 'w') as f:
-                            f.write(f"{idx}/{len(package_names)}|Processando: {package_name}|{job.total_documents}")
+                        self._write_progress_file(
+                            progress_file,
+                            f"{idx}/{len(package_names)}|Processando: {package_name}|{job.total_documents}",
+                            force=True
+                        )
                         logger.debug(f"Progress file updated: {idx}/{len(package_names)}")
                     except Exception as e:
                         logger.error(f"Failed to update progress file: {e}")
@@ -168,8 +260,11 @@ class PortalIngestionService:
                     # Atualizar progresso após completar
                     docs_inserted = result.get('documents_inserted', 0)
                     try:
-                        with open(progress_file, 'w') as f:
-                            f.write(f"{idx}/{len(package_names)}|Completado: {package_name}|{job.total_documents}")
+                        self._write_progress_file(
+                            progress_file,
+                            f"{idx}/{len(package_names)}|Completado: {package_name}|{job.total_documents}",
+                            force=True
+                        )
                         logger.info(f"Package completed: {package_name} ({docs_inserted} docs)")
                     except Exception as e:
                         logger.error(f"Failed to update progress file after completion: {e}")
@@ -199,6 +294,9 @@ class PortalIngestionService:
                     
                     db.commit()
             
+            # Gravar conclusões de lineage acumuladas durante o job
+            self.flush_lineage()
+            
             # Finalizar job
             job.status = "completed"
             job.completed_at = datetime.utcnow()
@@ -231,6 +329,7 @@ class PortalIngestionService:
             job.error_message = str(e)
             job.completed_at = datetime.utcnow()
             db.commit()
+            self.flush_lineage()
             
             # Limpar arquivo de progresso
             try:
@@ -413,7 +512,8 @@ class PortalIngestionService:
                             "raw_file_id": raw_file.id,
                             "file_size_bytes": len(content_bytes),
                             "sha256_hash": raw_file.sha256_hash
-                        }
+                        },
+                        defer_commit=True
                     )
             
             # ============================================================
@@ -432,7 +532,7 @@ class PortalIngestionService:
             if resource_format == "TXT":
                 documents = self.parser.parse_txt(content, resource_name)
             elif resource_format == "CSV":
-                documents = self.parser.parse_csv(content, resource_name)
+                documents = self.parser.parse_csv_bytes(content_bytes, resource_name)
             else:
                 raise ValueError(f"Unsupported format: {resource_format}")
             
@@ -449,6 +549,9 @@ class PortalIngestionService:
             # FASE 1.3: CRIAR PARSED DATA (linha/coluna estruturada)
             # ============================================================
             parsed_data_ids = []
+            parsed_data_rows = []
+            parsed_at = datetime.utcnow()
+            processed_at = parsed_at.isoformat()
             
             for idx, doc in enumerate(documents):
                 # Adicionar metadados base
@@ -456,7 +559,7 @@ class PortalIngestionService:
                 doc["municipality_id"] = municipality_id
                 doc["resource_url"] = resource_url
                 doc["resource_format"] = resource_format
-                doc["processed_at"] = datetime.utcnow().isoformat()
+                doc["processed_at"] = processed_at
                 
                 # Extrair metadados estruturados para CSV
                 if resource_format == "CSV":
@@ -472,25 +575,26 @@ class PortalIngestionService:
                     doc["metadata_valid"] = is_valid
                     doc["metadata_quality"] = quality_score
                 
-                # Criar ParsedData no PostgreSQL
+                # Preparar ParsedData (ID gerado aqui; gravação em lote abaixo)
                 if raw_file and self.db:
-                    parsed_data = ParsedData(
-                        raw_file_id=raw_file.id,
-                        row_number=doc.get("row_number", idx + 1),
-                        data=doc.get("fields", {}),
-                        data_normalized={},  # TODO: normalizar na Fase 2
-                        text_content=doc.get("content", "")
-                    )
-                    
-                    self.db.add(parsed_data)
-                    self.db.flush()
+                    parsed_data_id = generate_uuid()
+                    parsed_data_rows.append({
+                        "id": parsed_data_id,
+                        "raw_file_id": raw_file.id,
+                        "row_number": doc.get("row_number", idx + 1),
+                        "data": doc.get("fields", {}),
+                        "data_normalized": {},  # TODO: normalizar na Fase 2
+                        "text_content": doc.get("content", ""),
+                        "parsed_at": parsed_at
+                    })
                     
-                    parsed_data_ids.append(parsed_data.id)
+                    parsed_data_ids.append(parsed_data_id)
                     
                     # Adicionar parsed_data_id ao documento (para ChromaDB)
-                    doc["parsed_data_id"] = parsed_data.id
+                    doc["parsed_data_id"] = parsed_data_id
             
             if raw_file and self.db:
+                self._insert_parsed_data(parsed_data_rows)
                 self.db.commit()
             
             # Completar lineage de parsing
@@ -500,7 +604,8 @@ class PortalIngestionService:
                     result={
                         "rows_parsed": len(documents),
                         "parsed_data_ids": parsed_data_ids
-                    }
+                    },
+                    defer_commit=True
                 )
             
             # ============================================================
@@ -514,17 +619,20 @@ class PortalIngestionService:
                     
                     file_schema = await self.schema_discovery_service.discover_schema(
                         raw_file=raw_file,
-                        content=content,
+                        content=content_bytes,
                         delimiter=";"
                     )
                     
+                    # total_rows é do arquivo que originou o schema (pode ser
+                    # compartilhado); as linhas deste arquivo são os documentos
                     logger.info(
                         f"✅ Schema discovered: {file_schema.total_columns} columns, "
-                        f"{file_schema.total_rows} rows"
+                        f"{len(documents)} rows"
                     )
                     
-                    # Log schema para debug (formato LLM)
-                    logger.debug(f"\n{file_schema.format_for_llm()}")
+                    # Log schema para debug (formato LLM) - só formata se DEBUG ativo
+                    if settings.LOG_LEVEL == "DEBUG":
+                        logger.debug(f"\n{file_schema.format_for_llm()}")
                     
                 except Exception as e:
                     logger.error(f"⚠️ Schema discovery failed: {e}")
@@ -566,19 +674,21 @@ class PortalIngestionService:
                 error=str(e)
             )
             
-            # Registrar falha no lineage
+            # Registrar falha no lineage (traceback formatado uma única vez)
+            error_traceback = traceback.format_exc() if (lineage_download or lineage_parse) else None
+            
             if lineage_download:
                 self.lineage_service.fail_operation(
                     lineage_download,
                     error_message=str(e),
-                    error_traceback=traceback.format_exc()
+                    error_traceback=error_traceback
                 )
             
             if lineage_parse:
                 self.lineage_service.fail_operation(
                     lineage_parse,
                     error_message=str(e),
-                    error_traceback=traceback.format_exc()
+                    error_traceback=error_traceback
                 )
             
             raise
@@ -627,7 +737,11 @@ class PortalIngestionService:
             raw_file_id: ID do raw file (para lineage)
         """
         lineage_embedding = None
-        chromadb_ids = []
+        # Amostra dos IDs inseridos para o lineage (limitada, sem acumular todos)
+        chromadb_ids = deque(maxlen=10)
+        
+        # Campos fixos dos logs deste resource (vinculados uma única vez)
+        store_logger = logger.bind(collection=collection_name, total=len(documents))
         
         try:
             # Registrar lineage de embedding
@@ -644,123 +758,181 @@ class PortalIngestionService:
             # Batch processing (1000 docs por vez)
             batch_size = 1000
             
-            for i in range(0, len(documents), batch_size):
-                batch = documents[i:i + batch_size]
-                
-                # Preparar dados para ChromaDB
-                texts = []
-                metadatas = []
-                ids = []
-                
-                for idx, doc in enumerate(batch):
-                    text = doc.get("content", "")
-                    
-                    # Metadados: priorizar structured_metadata, caso contrário usar campos base
-                    if "structured_metadata" in doc and doc["structured_metadata"]:
-                        # Usar metadados estruturados (indexáveis!)
-                        metadata = doc["structured_metadata"].copy()
+            # Criar ou obter collection (uma única vez para todos os batches)
+            collection = self.vector_db.get_or_create_collection(collection_name)
+            
+            # Contador local de documentos inseridos (evita collection.count() por batch)
+            total_inserted = 0
+            
+            # Metadados base idênticos para todos os documentos do resource
+            first_doc = documents[0] if documents else {}
+            base_metadata = {
+                "package_name": first_doc.get("package_name", ""),
+                "municipality_id": first_doc.get("municipality_id", ""),
+                "resource_name": first_doc.get("resource_name", ""),
+                "resource_url": first_doc.get("resource_url", ""),
+                "resource_format": first_doc.get("resource_format", ""),
+                "processed_at": first_doc.get("processed_at", "")
+            }
+            
+            # Callback para atualizar progresso dos batches (definido uma vez por resource)
+            def update_batch_progress(current_batch: int, total_batches: int):
+                if progress_file and job_id:
+                    try:
+                        percentage = int((current_batch / total_batches) * 100)
+                        message = f"Processando embeddings: batch {current_batch}/{total_batches}"
+                        # Durante embeddings, não sabemos quantos docs foram inseridos
+                        docs_inserted = 0
                         
-                        # Adicionar metadados base que não estão nos structured
-                        metadata["package_name"] = doc.get("package_name", "")
-                        metadata["municipality_id"] = doc.get("municipality_id", "")
-                        metadata["resource_name"] = doc.get("resource_name", "")
-                        metadata["resource_url"] = doc.get("resource_url", "")
-                        metadata["resource_format"] = doc.get("resource_format", "")
-                        metadata["processed_at"] = doc.get("processed_at", "")
-                        metadata["row_number"] = doc.get("row_number", 0)
-                        metadata["metadata_quality"] = doc.get("metadata_quality", 0.0)
+                        self._write_progress_file(
+                            progress_file,
+                            f"{current_batch}|{total_batches}|{message}|{percentage}|{docs_inserted}",
+                            force=current_batch == total_batches
+                        )
                         
-                        # IMPORTANTE: ChromaDB requer que metadados sejam tipos simples
-                        # Converter valores complexos para string
-                        for key, value in metadata.items():
-                            if isinstance(value, (dict, list)):
-                                metadata[key] = json.dumps(value, ensure_ascii=False)
-                            elif not isinstance(value, (str, int, float, bool)):
-                                metadata[key] = str(value)
-                    else:
-                        # Fallback: metadados base (sem estruturação)
-                        metadata = {}
-                        for k, v in doc.items():
-                            if k not in ["content", "fields", "structured_metadata"]:
-                                # Converter para tipos simples
-                                if isinstance(v, (dict, list)):
-                                    metadata[k] = json.dumps(v, ensure_ascii=False)
-                                else:
-                                    metadata[k] = str(v) if v is not None else ""
-                    
-                    # ID único
-                    doc_id = f"{collection_name}_{i + idx}"
-                    
-                    texts.append(text)
-                    metadatas.append(metadata)
-                    ids.append(doc_id)
-                
-                # Callback para atualizar progresso dos batches
-                def update_batch_progress(current_batch: int, total_batches: int):
-                    if progress_file and job_id:
-                        try:
-                            percentage = int((current_batch / total_batches) * 100)
-                            message = f"Processando embeddings: batch {current_batch}/{total_batches}"
-                            # Durante embeddings, não sabemos quantos docs foram inseridos
-                            docs_inserted = 0
-                            
-                            with open(progress_file, 'w') as f:
-                                f.write(f"{current_batch}|{total_batches}|{message}|{percentage}|{docs_inserted}")
-                            
-                            logger.debug(
-                                f"Batch progress updated",
-                                batch=current_batch,
-                                total=total_batches,
-                                percentage=percentage
-                            )
-                        except Exception as e:
-                            logger.error(f"Failed to update batch progress: {e}")
-                
-                # Gerar embeddings (não é async) com callback de progresso
-                embeddings = self.embedding_service.generate_embeddings_batch(
-                    texts=texts,
-                    progress_callback=update_batch_progress if progress_file else None
-                )
-                
-                # Criar ou obter collection
-                collection = self.vector_db.get_or_create_collection(collection_name)
-                
-                # Adicionar documentos
-                collection.add(
-                    embeddings=embeddings,
-                    documents=texts,
-                    metadatas=metadatas,
-                    ids=ids
-                )
+                        logger.debug(
+                            f"Batch progress updated",
+                            batch=current_batch,
+                            total=total_batches,
+                            percentage=percentage
+                        )
+                    except Exception as e:
+                        logger.error(f"Failed to update batch progress: {e}")
+            
+            # Inserções no ChromaDB rodam em workers consumindo uma fila, para que
+            # o embedding do próximo batch não espere o commit do batch anterior
+            insert_queue: asyncio.Queue = asyncio.Queue(maxsize=4)
+            insert_errors: List[Exception] = []
+            
+            async def insert_worker():
+                nonlocal total_inserted
                 
-                # Atualizar progresso APÓS inserção no ChromaDB
-                if progress_file and job_id:
+                while True:
+                    item = await insert_queue.get()
                     try:
-                        # Total de documentos inseridos até agora
-                        total_inserted = i + len(batch)
-                        current_collection = self.vector_db.get_or_create_collection(collection_name)
-                        actual_count = current_collection.count()
+                        if item is None:
+                            return
+                        if insert_errors:
+                            # Já houve falha: apenas drenar a fila
+                            continue
                         
-                        message = f"Documentos inseridos no ChromaDB: {actual_count}"
+                        batch_start, ids, texts, metadatas, embeddings = item
                         
-                        with open(progress_file, 'w') as f:
-                            # Formato: current_batch|total_batches|message|percentage|documents_inserted
-                            f.write(f"0|0|{message}|100|{actual_count}")
+                        # Adicionar documentos (cliente ChromaDB é síncrono)
+                        await asyncio.to_thread(
+                            collection.add,
+                            embeddings=embeddings,
+                            documents=texts,
+                            metadatas=metadatas,
+                            ids=ids
+                        )
+                        total_inserted += len(ids)
+                        chromadb_ids.extend(ids)
+                        
+                        # Atualizar progresso APÓS inserção no ChromaDB
+                        if progress_file and job_id:
+                            try:
+                                message = f"Documentos inseridos no ChromaDB: {total_inserted}"
+                                
+                                # Formato: current_batch|total_batches|message|percentage|documents_inserted
+                                self._write_progress_file(
+                                    progress_file,
+                                    f"0|0|{message}|100|{total_inserted}",
+                                    force=total_inserted == len(documents)
+                                )
+                                
+                                store_logger.info(
+                                    f"Documents inserted in ChromaDB",
+                                    inserted=total_inserted
+                                )
+                            except Exception as e:
+                                logger.error(f"Failed to update final progress: {e}")
                         
-                        logger.info(
-                            f"Documents inserted in ChromaDB",
-                            inserted=actual_count,
-                            expected=total_inserted
+                        store_logger.info(
+                            f"Batch stored in ChromaDB",
+                            batch=f"{batch_start}-{batch_start + len(ids)}"
                         )
                     except Exception as e:
-                        logger.error(f"Failed to update final progress: {e}")
+                        insert_errors.append(e)
+                    finally:
+                        insert_queue.task_done()
+            
+            insert_workers = [
+                asyncio.create_task(insert_worker())
+                for _ in range(self.CHROMADB_INSERT_WORKERS)
+            ]
+            
+            try:
+                for i in range(0, len(documents), batch_size):
+                    batch = documents[i:i + batch_size]
                 
-                logger.info(
-                    f"Batch stored in ChromaDB",
-                    collection=collection_name,
-                    batch=f"{i}-{i + len(batch)}",
-                    total=len(documents)
-                )
+                    # Preparar dados para ChromaDB
+                    texts = [doc.get("content", "") for doc in batch]
+                    ids = [f"{collection_name}_{n}" for n in range(i, i + len(batch))]
+                    metadatas = []
+                
+                    for doc in batch:
+                        # Metadados: priorizar structured_metadata, caso contrário usar campos base
+                        if "structured_metadata" in doc and doc["structured_metadata"]:
+                            # Usar metadados estruturados (indexáveis!) + metadados base
+                            metadata = {
+                                **doc["structured_metadata"],
+                                **base_metadata,
+                                "row_number": doc.get("row_number", 0),
+                                "metadata_quality": doc.get("metadata_quality", 0.0)
+                            }
+                        
+                            # IMPORTANTE: ChromaDB requer que metadados sejam tipos simples
+                            # Converter valores complexos para string
+                            for key, value in metadata.items():
+                                if isinstance(value, (dict, list)):
+                                    metadata[key] = json.dumps(value, ensure_ascii=False)
+                                elif not isinstance(value, (str, int, float, bool)):
+                                    metadata[key] = str(value)
+                        else:
+                            # Fallback: metadados base (sem estruturação)
+                            metadata = {}
+                            for k, v in doc.items():
+                                if k not in ["content", "fields", "structured_metadata"]:
+                                    # Converter para tipos simples
+                                    if isinstance(v, (dict, list)):
+                                        metadata[k] = json.dumps(v, ensure_ascii=False)
+                                    else:
+                                        metadata[k] = str(v) if v is not None else ""
+                    
+                        metadatas.append(metadata)
+                
+                    # Textos repetidos (comuns em CSVs do portal) são embedados uma vez só;
+                    # só vale a pena quando há duplicação relevante (>= 10%)
+                    unique_texts = list(dict.fromkeys(texts))
+                    deduplicate = len(unique_texts) < 0.9 * len(texts)
+                
+                    # Gerar embeddings (não é async) em thread separada para não
+                    # bloquear o event loop enquanto o modelo processa o batch
+                    embeddings = await asyncio.to_thread(
+                        self.embedding_service.generate_embeddings_batch,
+                        texts=unique_texts if deduplicate else texts,
+                        progress_callback=update_batch_progress if progress_file else None
+                    )
+                
+                    if deduplicate:
+                        text_position = {text: n for n, text in enumerate(unique_texts)}
+                        embeddings = [embeddings[text_position[text]] for text in texts]
+                
+                    # Enfileirar batch para inserção (bloqueia se a fila estiver cheia)
+                    await insert_queue.put((i, ids, texts, metadatas, embeddings))
+                
+                    if insert_errors:
+                        break
+            
+            finally:
+                # Sinalizar fim para os workers e aguardar inserções pendentes
+                for _ in insert_workers:
+                    await insert_queue.put(None)
+                await asyncio.gather(*insert_workers)
+            
+            if insert_errors:
+                raise insert_errors[0]
             
             # Completar lineage de embedding
             if lineage_embedding:
@@ -769,16 +941,16 @@ class PortalIngestionService:
                     result={
                         "collection_name": collection_name,
                         "documents_inserted": len(documents),
-                        "chromadb_ids": chromadb_ids[:10]  # Primeiros 10 IDs
+                        "chromadb_ids": list(chromadb_ids)  # Últimos 10 IDs
                     },
                     embedding_model=settings.EMBEDDING_MODEL,
-                    embedding_dimensions="384"
+                    embedding_dimensions="384",
+                    defer_commit=True
                 )
             
         except Exception as e:
-            logger.error(
+            store_logger.error(
                 f"Error storing documents in ChromaDB",
-                collection=collection_name,
                 error=str(e)
             )
             
@@ -806,17 +978,17 @@ class PortalIngestionService:
         try:
             logger.debug(f"Querying job with id: {job_id}")
             
-            job = db.query(PortalIngestionJob).filter(
-                PortalIngestionJob.id == job_id
-            ).first()
+            job = db.execute(_JOB_BY_ID_STMT, {"jid": job_id}).scalar_one_or_none()
             
             if not job:
                 logger.warning(f"Job not found in database: {job_id}")
-                # Listar todos os jobs para debug
-                all_jobs = db.query(PortalIngestionJob).all()
-                logger.debug(f"Total jobs in database: {len(all_jobs)}")
-                if all_jobs:
-                    logger.debug(f"Sample job IDs: {[j.id[:8] + '...' for j in all_jobs[:3]]}")
+                # Informações de debug (sem carregar todos os jobs em memória)
+                if settings.LOG_LEVEL == "DEBUG":
+                    total_jobs = db.query(func.count(PortalIngestionJob.id)).scalar()
+                    logger.debug(f"Total jobs in database: {total_jobs}")
+                    if total_jobs:
+                        sample_ids = db.query(PortalIngestionJob.id).limit(3).all()
+                        logger.debug(f"Sample job IDs: {[row.id[:8] + '...' for row in sample_ids]}")
                 return None
             
             logger.debug(f"Job found: {job.id}, status: {job.status}")
@@ -833,14 +1005,14 @@ class PortalIngestionService:
         Returns:
             Lista de nomes de collections
         """
+        cached = PortalIngestionService._collections_cache
+        if cached and time.monotonic() - cached[0] < self.COLLECTIONS_CACHE_TTL:
+            return list(cached[1])
+        
         try:
-            all_collections = self.vector_db.list_collections()
-            # all_collections já é uma lista de strings (nomes)
-            portal_collections = [
-                c for c in all_collections
-                if c.startswith("portal_")
-            ]
-            return portal_collections
+            portal_collections = self.vector_db.list_collections(prefix="portal_")
+            PortalIngestionService._collections_cache = (time.monotonic(), portal_collections)
+            return list(portal_collections)
         except Exception as e:
             logger.error(f"Error listing collections", error=str(e))
             return []
@@ -857,6 +1029,7 @@ class PortalIngestionService:
         """
         try:
             self.vector_db.delete_collection(collection_name)
+            PortalIngestionService._collections_cache = None
             logger.info(f"Collection deleted", collection=collection_name)
             return True
         except Exception as e:
@@ -866,4 +1039,39 @@ class PortalIngestionService:
                 error=str(e)
             )
             return False
+    
+    def delete_collections(self, collection_names: List[str]) -> Dict[str, List[str]]:
+        """
+        Deleta várias collections do ChromaDB de uma vez
+        
+        Falhas individuais não interrompem as demais; o cache de collections
+        é invalidado uma única vez e o resultado é registrado em um só log.
+        
+        Args:
+            collection_names: Nomes das collections
+            
+        Returns:
+            Dict com as listas "deleted" e "failed"
+        """
+        deleted = []
+        failed = []
+        
+        for name in dict.fromkeys(collection_names):
+            try:
+                self.vector_db.delete_collection(name)
+                deleted.append(name)
+            except Exception as e:
+                failed.append(name)
+                logger.warning(f"Error deleting collection", collection=name, error=str(e))
+        
+        if deleted:
+            PortalIngestionService._collections_cache = None
+        
+        logger.info(
+            f"Collections deleted",
+            deleted=len(deleted),
+            failed=len(failed)
+        )
+        
+        return {"deleted": deleted, "failed": failed}
 
@@ -8,16 +8,59 @@ Este módulo constrói prompts otimizados que guiam o Gemini a:
 4. Gerar respostas estruturadas em JSON
 """
 
-from typing import List, Dict, Any, Optional
-from datetime import datetime
+from typing import List, Dict, Any, Optional, Tuple
+from datetime import datetime, timezone
+from functools import lru_cache
+from itertools import islice
+import io
 import json
+import time
+
+
+@lru_cache(maxsize=32)
+def _format_packages_list(packages: Tuple[str, ...], total: int) -> str:
+    """Bloco com a lista de packages; o universo de packages muda pouco entre chamadas."""
+    packages_list = "\n".join(f"  - {pkg}" for pkg in packages)
+    if total > len(packages):
+        packages_list += f"\n  ... e mais {total - len(packages)} packages"
+    return packages_list
 
 
 class PromptBuilder:
     """Construtor de prompts para o Gemini AI."""
 
+    # Linha divisória e separador entre seções do prompt
+    RULE = "=" * 80
+    SEPARATOR = "\n" + RULE + "\n"
+    SECTION_BREAK = SEPARATOR + "\n"
+
+    # Tamanho dos trechos de contexto exibidos no prompt
+    CONTENT_PREVIEW_CHARS = 200
+    TEXT_PREVIEW_CHARS = 150
+
+    # Máximo de packages listados no prompt de identificação
+    MAX_LISTED_PACKAGES = 50
+
+    # (minuto, data formatada) da última consulta; mantém o prompt idêntico dentro do minuto
+    _ts_cache = (0, "")
+
+    # Bloco final (fixo) do prompt de análise
+    FINAL_INSTRUCTIONS = "\n".join((
+        "INSTRUÇÕES FINAIS:",
+        "1. Analise a pergunta cuidadosamente",
+        "2. Use APENAS os dados fornecidos acima",
+        "3. Se não houver dados suficientes, indique claramente",
+        "4. Retorne JSON válido seguindo o formato especificado",
+        "5. Seja claro, preciso e objetivo",
+        "6. Sempre cite as fontes dos dados",
+        "\nRESPOSTA (JSON):",
+    ))
+
     def __init__(self):
+        # Partes imutáveis do prompt são construídas uma única vez
         self.system_context = self._build_system_context()
+        self._response_format_instructions = self._build_response_format_instructions()
+        self._examples = self._build_examples()
 
     def _build_system_context(self) -> str:
         """Constrói o contexto do sistema que define o papel do Gemini."""
@@ -120,74 +163,87 @@ IMPORTANTE:
 - Forneça sugestões de perguntas relacionadas
 """
 
+    @classmethod
+    def _current_timestamp(cls) -> str:
+        """Data/hora UTC formatada, recalculada apenas quando o minuto muda."""
+        bucket = int(time.time() // 60)
+        if bucket != cls._ts_cache[0]:
+            cls._ts_cache = (bucket, datetime.fromtimestamp(bucket * 60, timezone.utc).strftime('%d/%m/%Y %H:%M'))
+        return cls._ts_cache[1]
+
+    @staticmethod
+    def _preview(ctx: Dict[str, Any], key: str, limit: int) -> str:
+        """Trecho curto do contexto, usando o campo 'preview' já truncado na busca quando houver."""
+        return ctx.get("preview") or ctx.get(key, "")[:limit]
+
     def _build_data_sources_info(
         self,
+        buf: io.StringIO,
         loa_context: Optional[List[Dict[str, Any]]] = None,
         ldo_context: Optional[List[Dict[str, Any]]] = None,
         portal_packages: Optional[List[str]] = None,
         portal_data: Optional[List[Dict[str, Any]]] = None,
         portal_ingested_context: Optional[List[Dict[str, Any]]] = None,
-    ) -> str:
-        """Constrói informações sobre as fontes de dados disponíveis."""
-        sections = ["FONTES DE DADOS DISPONÍVEIS:\n"]
+    ) -> None:
+        """Escreve no buffer as informações sobre as fontes de dados disponíveis."""
+        write = buf.write
+        write("FONTES DE DADOS DISPONÍVEIS:\n\n")
 
         # LOA
         if loa_context and len(loa_context) > 0:
-            sections.append("1. LEI ORÇAMENTÁRIA ANUAL (LOA):")
-            sections.append(f"   - {len(loa_context)} trechos relevantes encontrados")
+            write("1. LEI ORÇAMENTÁRIA ANUAL (LOA):\n")
+            write(f"   - {len(loa_context)} trechos relevantes encontrados\n")
             for i, ctx in enumerate(loa_context[:3], 1):
-                content = ctx.get("content", "")[:200]
-                sections.append(f"   Trecho {i}: {content}...")
+                content = self._preview(ctx, "content", self.CONTENT_PREVIEW_CHARS)
+                write(f"   Trecho {i}: {content}...\n")
             if len(loa_context) > 3:
-                sections.append(f"   ... e mais {len(loa_context) - 3} trechos")
-            sections.append("")
+                write(f"   ... e mais {len(loa_context) - 3} trechos\n")
+            write("\n")
         else:
-            sections.append("1. LEI ORÇAMENTÁRIA ANUAL (LOA): Nenhum documento processado ainda\n")
+            write("1. LEI ORÇAMENTÁRIA ANUAL (LOA): Nenhum documento processado ainda\n\n")
 
         # LDO
         if ldo_context and len(ldo_context) > 0:
-            sections.append("2. LEI DE DIRETRIZES ORÇAMENTÁRIAS (LDO):")
-            sections.append(f"   - {len(ldo_context)} trechos relevantes encontrados")
+            write("2. LEI DE DIRETRIZES ORÇAMENTÁRIAS (LDO):\n")
+            write(f"   - {len(ldo_context)} trechos relevantes encontrados\n")
             for i, ctx in enumerate(ldo_context[:3], 1):
-                content = ctx.get("content", "")[:200]
-                sections.append(f"   Trecho {i}: {content}...")
+                content = self._preview(ctx, "content", self.CONTENT_PREVIEW_CHARS)
+                write(f"   Trecho {i}: {content}...\n")
             if len(ldo_context) > 3:
-                sections.append(f"   ... e mais {len(ldo_context) - 3} trechos")
-            sections.append("")
+                write(f"   ... e mais {len(ldo_context) - 3} trechos\n")
+            write("\n")
         else:
-            sections.append("2. LEI DE DIRETRIZES ORÇAMENTÁRIAS (LDO): Nenhum documento processado ainda\n")
+            write("2. LEI DE DIRETRIZES ORÇAMENTÁRIAS (LDO): Nenhum documento processado ainda\n\n")
 
         # Portal - Dados Ingeridos (novo)
         if portal_ingested_context and len(portal_ingested_context) > 0:
-            sections.append("3. PORTAL DA TRANSPARÊNCIA (DADOS INGERIDOS E PROCESSADOS):")
-            sections.append(f"   - {len(portal_ingested_context)} registros relevantes encontrados no banco de dados")
+            write("3. PORTAL DA TRANSPARÊNCIA (DADOS INGERIDOS E PROCESSADOS):\n")
+            write(f"   - {len(portal_ingested_context)} registros relevantes encontrados no banco de dados\n")
             for i, ctx in enumerate(portal_ingested_context[:5], 1):
-                text = ctx.get("text", "")[:150]
+                text = self._preview(ctx, "text", self.TEXT_PREVIEW_CHARS)
                 source = ctx.get("source", "").replace("portal_", "")
-                sections.append(f"   Registro {i} ({source}): {text}...")
+                write(f"   Registro {i} ({source}): {text}...\n")
             if len(portal_ingested_context) > 5:
-                sections.append(f"   ... e mais {len(portal_ingested_context) - 5} registros")
-            sections.append("")
+                write(f"   ... e mais {len(portal_ingested_context) - 5} registros\n")
+            write("\n")
         
         # Portal - Datasets disponíveis
         if portal_packages and len(portal_packages) > 0:
-            sections.append("4. PORTAL DA TRANSPARÊNCIA (DATASETS DISPONÍVEIS):")
-            sections.append(f"   - {len(portal_packages)} datasets identificados como relevantes")
-            sections.append(f"   Exemplos: {', '.join(portal_packages[:5])}")
+            write("4. PORTAL DA TRANSPARÊNCIA (DATASETS DISPONÍVEIS):\n")
+            write(f"   - {len(portal_packages)} datasets identificados como relevantes\n")
+            write(f"   Exemplos: {', '.join(portal_packages[:5])}\n")
             if len(portal_packages) > 5:
-                sections.append(f"   ... e mais {len(portal_packages) - 5} datasets")
-            sections.append("")
+                write(f"   ... e mais {len(portal_packages) - 5} datasets\n")
+            write("\n")
 
         if portal_data and len(portal_data) > 0:
-            sections.append("   METADADOS DOS DATASETS:")
+            write("   METADADOS DOS DATASETS:\n")
             for i, data in enumerate(portal_data[:2], 1):
-                sections.append(f"   Dataset {i}: {data.get('title', 'Sem título')}")
-                sections.append(f"   - Recursos: {len(data.get('resources', []))}")
+                write(f"   Dataset {i}: {data.get('title', 'Sem título')}\n")
+                write(f"   - Recursos: {len(data.get('resources', []))}\n")
             if len(portal_data) > 2:
-                sections.append(f"   ... e mais {len(portal_data) - 2} datasets")
-            sections.append("")
-
-        return "\n".join(sections)
+                write(f"   ... e mais {len(portal_data) - 2} datasets\n")
+            write("\n")
 
     def _build_examples(self) -> str:
         """Exemplos de perguntas e respostas esperadas."""
@@ -290,50 +346,42 @@ Exemplo 2 - Pergunta: "Compare os gastos em saúde e educação"
         Returns:
             Prompt completo formatado
         """
-        prompt_parts = [
-            self.system_context,
-            "\n" + "=" * 80 + "\n",
-            f"MUNICÍPIO: {municipality} - {state}",
-            f"ANO DE REFERÊNCIA: {year}",
-            f"DATA DA CONSULTA: {datetime.utcnow().strftime('%d/%m/%Y %H:%M')} UTC",
-            "\n" + "=" * 80 + "\n",
-        ]
+        buf = io.StringIO()
+        write = buf.write
+        
+        write(self.system_context)
+        write("\n")
+        write(self.SECTION_BREAK)
+        write(f"MUNICÍPIO: {municipality} - {state}\n")
+        write(f"ANO DE REFERÊNCIA: {year}\n")
+        write(f"DATA DA CONSULTA: {self._current_timestamp()} UTC\n")
+        write(self.SECTION_BREAK)
         
         # Adicionar histórico do chat se existir
         if chat_history and len(chat_history) > 0:
-            prompt_parts.extend([
-                "HISTÓRICO DA CONVERSA:",
-                "=" * 80,
-            ])
+            write("HISTÓRICO DA CONVERSA:\n")
+            write(self.RULE)
+            write("\n")
             for msg in chat_history:
                 role_label = "USUÁRIO" if msg["role"] == "user" else "ASSISTENTE"
-                prompt_parts.append(f"\n{role_label}: {msg['content'][:200]}")
-            prompt_parts.extend([
-                "\n" + "=" * 80 + "\n",
-            ])
+                write(f"\n{role_label}: {msg['content'][:200]}\n")
+            write(self.SECTION_BREAK)
         
-        prompt_parts.extend([
-            self._build_data_sources_info(
-                loa_context, ldo_context, portal_packages, portal_data, portal_ingested_context
-            ),
-            "\n" + "=" * 80 + "\n",
-            self._build_response_format_instructions(),
-            "\n" + "=" * 80 + "\n",
-            self._build_examples(),
-            "\n" + "=" * 80 + "\n",
-            f"PERGUNTA ATUAL DO USUÁRIO:\n{question}",
-            "\n" + "=" * 80 + "\n",
-            "INSTRUÇÕES FINAIS:",
-            "1. Analise a pergunta cuidadosamente",
-            "2. Use APENAS os dados fornecidos acima",
-            "3. Se não houver dados suficientes, indique claramente",
-            "4. Retorne JSON válido seguindo o formato especificado",
-            "5. Seja claro, preciso e objetivo",
-            "6. Sempre cite as fontes dos dados",
-            "\nRESPOSTA (JSON):"
-        ])
-
-        return "\n".join(prompt_parts)
+        self._build_data_sources_info(
+            buf, loa_context, ldo_context, portal_packages, portal_data, portal_ingested_context
+        )
+        write(self.SECTION_BREAK)
+        write(self._response_format_instructions)
+        write("\n")
+        write(self.SECTION_BREAK)
+        write(self._examples)
+        write("\n")
+        write(self.SECTION_BREAK)
+        write(f"PERGUNTA ATUAL DO USUÁRIO:\n{question}\n")
+        write(self.SECTION_BREAK)
+        write(self.FINAL_INSTRUCTIONS)
+
+        return buf.getvalue()
 
     def build_package_identification_prompt(
         self,
@@ -352,9 +400,10 @@ Exemplo 2 - Pergunta: "Compare os gastos em saúde e educação"
         Returns:
             Prompt para identificação de packages
         """
-        packages_list = "\n".join([f"  - {pkg}" for pkg in available_packages[:50]])
-        if len(available_packages) > 50:
-            packages_list += f"\n  ... e mais {len(available_packages) - 50} packages"
+        packages_list = _format_packages_list(
+            tuple(islice(available_packages, self.MAX_LISTED_PACKAGES)),
+            len(available_packages),
+        )
 
         prompt = f"""Você é um assistente especializado em dados de transparência pública.
 
@@ -3,9 +3,13 @@ Serviço de Planejamento de Queries (Fase 3)
 LLM analisa schemas e gera plano de busca otimizado
 """
 
+import asyncio
 import logging
-import json
-from typing import Dict, Any, List, Optional
+import orjson
+from collections import OrderedDict
+from dataclasses import asdict, dataclass
+from datetime import datetime
+from typing import Dict, Any, List, Optional, Tuple
 from sqlalchemy.orm import Session
 import google.generativeai as genai
 
@@ -16,38 +20,33 @@ from app.models.file_schema import FileSchema
 
 logger = logging.getLogger(__name__)
 
+# Modelo Gemini do planejador (singleton do módulo, criado na primeira instância)
+_GEMINI_MODEL: Optional[genai.GenerativeModel] = None
 
+
+def _get_gemini_model() -> genai.GenerativeModel:
+    """Configura o Gemini e cria o modelo apenas uma vez por processo"""
+    global _GEMINI_MODEL
+    if _GEMINI_MODEL is None:
+        genai.configure(api_key=settings.GEMINI_API_KEY)
+        _GEMINI_MODEL = genai.GenerativeModel("gemini-1.5-flash")
+    return _GEMINI_MODEL
+
+
+@dataclass(slots=True, frozen=True)
 class QueryPlan:
     """Representa um plano de query gerado pelo LLM"""
     
-    def __init__(
-        self,
-        strategy: str,
-        relevant_files: List[str],
-        field_mappings: List[Dict[str, Any]],
-        semantic_query: str,
-        filters: List[Dict[str, Any]],
-        explanation: str,
-        confidence: float
-    ):
-        self.strategy = strategy  # "structured" | "semantic" | "hybrid"
-        self.relevant_files = relevant_files
-        self.field_mappings = field_mappings
-        self.semantic_query = semantic_query
-        self.filters = filters
-        self.explanation = explanation
-        self.confidence = confidence
+    strategy: str  # "structured" | "semantic" | "hybrid"
+    relevant_files: List[str]
+    field_mappings: List[Dict[str, Any]]
+    semantic_query: str
+    filters: List[Dict[str, Any]]
+    explanation: str
+    confidence: float
     
     def to_dict(self) -> Dict[str, Any]:
-        return {
-            "strategy": self.strategy,
-            "relevant_files": self.relevant_files,
-            "field_mappings": self.field_mappings,
-            "semantic_query": self.semantic_query,
-            "filters": self.filters,
-            "explanation": self.explanation,
-            "confidence": self.confidence
-        }
+        return asdict(self)
 
 
 class QueryPlannerService:
@@ -55,14 +54,37 @@ class QueryPlannerService:
     Planeja queries usando LLM com awareness completo dos schemas
     """
     
+    # Cache LRU de schemas formatados para o LLM (compartilhado entre instâncias)
+    SCHEMA_FORMAT_CACHE_SIZE = 256
+    
+    # Orçamento de caracteres para os schemas no prompt (~6k tokens, chars / 4)
+    SCHEMAS_CHAR_BUDGET = 24000
+    
+    # Configuração de geração do planejamento (imutável, criada uma vez)
+    _GEN_CONFIG = genai.GenerationConfig(
+        temperature=0.2,
+        response_mime_type="application/json"
+    )
+    
+    # Máximo de chamadas simultâneas ao Gemini para planejamento
+    MAX_CONCURRENT_LLM_CALLS = 8
+    _llm_semaphore: Optional[asyncio.Semaphore] = None
+    _schema_format_cache: "OrderedDict[Tuple[str, datetime], str]" = OrderedDict()
+    
     def __init__(self, db: Session):
         self.db = db
         self.schema_service = SchemaDiscoveryService(db)
         self.field_mapper = SemanticFieldMapper(db)
         
-        # Configurar Gemini
-        genai.configure(api_key=settings.GEMINI_API_KEY)
-        self.model = genai.GenerativeModel("gemini-1.5-flash")
+        # Modelo Gemini compartilhado entre instâncias
+        self.model = _get_gemini_model()
+    
+    @classmethod
+    def _get_llm_semaphore(cls) -> asyncio.Semaphore:
+        """Semáforo que limita chamadas concorrentes ao Gemini (criado sob demanda)"""
+        if cls._llm_semaphore is None:
+            cls._llm_semaphore = asyncio.Semaphore(cls.MAX_CONCURRENT_LLM_CALLS)
+        return cls._llm_semaphore
     
     async def plan_query(
         self,
@@ -85,7 +107,8 @@ class QueryPlannerService:
             logger.info(f"🤔 Planning query: '{user_question}'")
             
             # 1. Obter schemas disponíveis
-            available_schemas = self._get_relevant_schemas(municipality_id)
+            # (consultas síncronas em thread para não bloquear o event loop)
+            available_schemas = await asyncio.to_thread(self._get_relevant_schemas, municipality_id)
             
             if not available_schemas:
                 logger.warning("No schemas available for planning")
@@ -94,7 +117,8 @@ class QueryPlannerService:
             logger.info(f"   Schemas disponíveis: {len(available_schemas)}")
             
             # 2. Obter mapeamentos iniciais (pre-analysis)
-            initial_mappings = self.field_mapper.map_user_query_to_fields(
+            initial_mappings = await asyncio.to_thread(
+                self.field_mapper.map_user_query_to_fields,
                 user_question,
                 file_schemas=available_schemas
             )
@@ -102,7 +126,10 @@ class QueryPlannerService:
             logger.info(f"   Mapeamentos iniciais: {len(initial_mappings)}")
             
             # 3. Formatar schemas para LLM
-            schemas_description = self._format_schemas_for_llm(available_schemas)
+            schemas_description = self._format_schemas_for_llm(
+                available_schemas,
+                initial_mappings=initial_mappings
+            )
             
             # 4. Gerar prompt para LLM
             prompt = self._build_planning_prompt(
@@ -115,16 +142,14 @@ class QueryPlannerService:
             # 5. Chamar LLM
             logger.debug("   Chamando Gemini para planejamento...")
             
-            response = self.model.generate_content(
-                prompt,
-                generation_config=genai.GenerationConfig(
-                    temperature=0.2,
-                    response_mime_type="application/json"
+            async with self._get_llm_semaphore():
+                response = await self.model.generate_content_async(
+                    prompt,
+                    generation_config=self._GEN_CONFIG
                 )
-            )
             
             # 6. Parsear resposta
-            plan_data = json.loads(response.text)
+            plan_data = orjson.loads(response.text)
             
             query_plan = QueryPlan(
                 strategy=plan_data.get("strategy", "hybrid"),
@@ -155,19 +180,62 @@ class QueryPlannerService:
         # TODO: Filtrar por municipality_id quando disponível
         return self.schema_service.get_all_active_schemas()
     
+    @classmethod
+    def _format_schema_cached(cls, schema: FileSchema) -> str:
+        """
+        Retorna schema.format_for_llm() memorizado
+        
+        Schemas não mudam depois de descobertos (uma nova descoberta gera um
+        novo registro), então (id, discovered_at) identifica o texto formatado.
+        """
+        key = (schema.id, schema.discovered_at)
+        cache = cls._schema_format_cache
+        
+        formatted = cache.get(key)
+        if formatted is not None:
+            cache.move_to_end(key)
+            return formatted
+        
+        formatted = schema.format_for_llm()
+        cache[key] = formatted
+        if len(cache) > cls.SCHEMA_FORMAT_CACHE_SIZE:
+            cache.popitem(last=False)
+        
+        return formatted
+    
     def _format_schemas_for_llm(
         self,
-        schemas: List[FileSchema]
+        schemas: List[FileSchema],
+        initial_mappings: Optional[List[FieldMapping]] = None
     ) -> str:
-        """Formata schemas de forma legível para LLM"""
+        """
+        Formata schemas de forma legível para LLM
+        
+        Os schemas são incluídos em ordem de relevância (soma das confianças
+        dos mapeamentos iniciais por arquivo) até esgotar o orçamento de
+        caracteres do prompt; o primeiro schema é sempre incluído.
+        """
+        if initial_mappings:
+            relevance: Dict[str, float] = {}
+            for m in initial_mappings:
+                relevance[m.file_schema_id] = relevance.get(m.file_schema_id, 0.0) + m.confidence
+            # sort é estável: schemas sem mapeamento mantêm a ordem original
+            schemas = sorted(schemas, key=lambda sc: relevance.get(sc.id, 0.0), reverse=True)
+        
         formatted = []
+        used_chars = 0
         
-        for schema in schemas[:10]:  # Limitar a 10 schemas para não ultrapassar token limit
-            formatted.append(schema.format_for_llm())
+        for schema in schemas:
+            text = self._format_schema_cached(schema)
+            if formatted and used_chars + len(text) > self.SCHEMAS_CHAR_BUDGET:
+                break
+            formatted.append(text)
             formatted.append("")
+            used_chars += len(text) + 1
         
-        if len(schemas) > 10:
-            formatted.append(f"... e mais {len(schemas) - 10} arquivos disponíveis")
+        included = len(formatted) // 2
+        if len(schemas) > included:
+            formatted.append(f"... e mais {len(schemas) - included} arquivos disponíveis")
         
         return "\n".join(formatted)
     
@@ -183,18 +251,25 @@ class QueryPlannerService:
         # Formatar mapeamentos iniciais
         mappings_text = ""
         if initial_mappings:
-            mappings_text = "\n\nMAPEAMENTOS DETECTADOS:\n"
-            for m in initial_mappings[:5]:
-                mappings_text += f"- '{m.query_text}' → Coluna '{m.column_name}' ({m.filename}) [confiança: {m.confidence:.2f}]\n"
+            parts = ["\n\nMAPEAMENTOS DETECTADOS:"]
+            parts.extend(
+                f"- '{m.query_text}' → Coluna '{m.column_name}' ({m.filename}) [confiança: {m.confidence:.2f}]"
+                for m in initial_mappings[:5]
+            )
+            parts.append("")
+            mappings_text = "\n".join(parts)
         
         # Formatar histórico
         history_text = ""
         if chat_history:
-            history_text = "\n\nHISTÓRICO DA CONVERSA:\n"
-            for msg in chat_history[-3:]:  # Últimas 3 mensagens
-                role = msg.get("role", "unknown")
-                content = msg.get("content", "")[:200]  # Limitar tamanho
-                history_text += f"- {role}: {content}\n"
+            parts = ["\n\nHISTÓRICO DA CONVERSA:"]
+            parts.extend(
+                # Últimas 3 mensagens, com tamanho limitado
+                f"- {msg.get('role', 'unknown')}: {msg.get('content', '')[:200]}"
+                for msg in chat_history[-3:]
+            )
+            parts.append("")
+            history_text = "\n".join(parts)
         
         prompt = f"""Você é um assistente especializado em análise de dados governamentais.
 
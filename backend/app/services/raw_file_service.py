@@ -2,17 +2,76 @@
 Serviço para gerenciar arquivos RAW (source of truth)
 """
 
+import asyncio
+import hashlib
 import logging
-from typing import Optional, Dict, Any, List, BinaryIO
-from datetime import datetime
+import os
+import shutil
+import ssl
+import threading
+import time
+from collections import OrderedDict
+from typing import Optional, Dict, Any, List, BinaryIO, Tuple, Union
+from datetime import datetime, timezone
 from sqlalchemy.orm import Session
 from io import BytesIO
 
-from app.models.raw_file import RawFile
+from app.models.raw_file import RawFile, generate_uuid
 from app.models.data_lineage import DataLineage
 
 logger = logging.getLogger(__name__)
 
+# Cache LRU (por processo) SHA256 → id do raw file, para deduplicação sem query por hash
+HASH_ID_CACHE_SIZE = 10000
+_hash_id_cache: "OrderedDict[str, str]" = OrderedDict()
+_hash_id_lock = threading.Lock()
+
+
+def _remember_hash_id(sha256_hash: str, raw_file_id: str) -> None:
+    with _hash_id_lock:
+        _hash_id_cache[sha256_hash] = raw_file_id
+        _hash_id_cache.move_to_end(sha256_hash)
+        if len(_hash_id_cache) > HASH_ID_CACHE_SIZE:
+            _hash_id_cache.popitem(last=False)
+
+
+# Arquivos menores que isso são armazenados no PostgreSQL; maiores, no filesystem
+MAX_DB_FILE_SIZE = 10 * 1024 * 1024  # 10MB
+
+
+# Abaixo disso o SHA-256 provavelmente não usa aceleração de hardware (SHA-NI)
+SHA256_MIN_THROUGHPUT_GBPS = 1.0
+
+
+def measure_sha256_throughput(sample_size: int = 1024 * 1024, rounds: int = 3) -> Dict[str, Any]:
+    """
+    Mede a vazão do SHA-256 (hashlib/OpenSSL) com um buffer em memória
+    
+    Usa uma única chamada por rodada (o caminho rápido do OpenSSL) e
+    reporta a melhor rodada, para não medir o aquecimento.
+    
+    Returns:
+        Dict com versão do OpenSSL, vazão em GB/s e se está abaixo do esperado
+    """
+    sample = os.urandom(sample_size)
+    best = float("inf")
+    for _ in range(rounds):
+        start = time.perf_counter()
+        hashlib.sha256(sample).digest()
+        best = min(best, time.perf_counter() - start)
+    
+    gbps = sample_size / best / 1e9 if best > 0 else float("inf")
+    return {
+        "openssl_version": ssl.OPENSSL_VERSION,
+        "sha256_gbps": round(gbps, 2),
+        "hardware_accelerated": gbps >= SHA256_MIN_THROUGHPUT_GBPS
+    }
+
+
+def _utcnow() -> datetime:
+    """UTC atual sem tzinfo (colunas DateTime do lineage são naive em UTC)."""
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
 
 class RawFileService:
     """
@@ -28,20 +87,22 @@ class RawFileService:
     
     async def store_raw_file(
         self,
-        content: bytes,
+        content: Union[bytes, str, os.PathLike, BinaryIO],
         filename: str,
         file_format: str,
         municipality_id: str,
         source_type: str,
         source_identifier: Optional[str] = None,
         metadata: Optional[Dict[str, Any]] = None,
-        file_path: Optional[str] = None
+        file_path: Optional[str] = None,
+        compute_md5: bool = False
     ) -> RawFile:
         """
         Armazena arquivo RAW
         
         Args:
-            content: Conteúdo do arquivo em bytes
+            content: Conteúdo do arquivo em bytes, ou caminho/stream para
+                arquivos grandes (lidos em blocos, sem carregar tudo na memória)
             filename: Nome do arquivo
             file_format: Formato (CSV, PDF, JSON, etc)
             municipality_id: ID do município
@@ -49,76 +110,364 @@ class RawFileService:
             source_identifier: Identificador da fonte (package_name, etc)
             metadata: Metadados adicionais
             file_path: Caminho se arquivo grande (> 10MB)
+            compute_md5: Calcular também o MD5 (o SHA256 já cobre
+                deduplicação e integridade; MD5 só para compatibilidade)
         
         Returns:
             RawFile: Objeto RawFile criado
         """
+        if not isinstance(content, (bytes, bytearray)):
+            return await asyncio.to_thread(
+                self._store_raw_file_stream,
+                content,
+                filename=filename,
+                file_format=file_format,
+                municipality_id=municipality_id,
+                source_type=source_type,
+                source_identifier=source_identifier,
+                metadata=metadata,
+                file_path=file_path,
+                compute_md5=compute_md5
+            )
+        
+        # 0. Pré-filtro de deduplicação pelo fingerprint rápido: se o arquivo
+        #    já existe, não é preciso calcular o hash completo
+        fast_fp = RawFile.calculate_fast_fp(content)
+        existing_file = await asyncio.to_thread(self._find_duplicate, content, fast_fp)
+        if existing_file:
+            logger.info(f"📦 Arquivo já existe (fingerprint: {fast_fp:x})")
+            logger.info(f"   ID existente: {existing_file.id}")
+            return existing_file
+        
+        # 1. Calcular hashes (SHA256, e MD5 se pedido, em uma única passada) fora do event loop
+        sha256_hash, md5_hash = await asyncio.to_thread(
+            RawFile.calculate_hashes, content, compute_md5
+        )
+        
+        # 2-5. Deduplicação, INSERT e commit são bloqueantes: rodar também em thread
+        #      (a sessão continua sendo usada por uma thread de cada vez)
+        return await asyncio.to_thread(
+            self._persist_raw_file,
+            content=content,
+            sha256_hash=sha256_hash,
+            md5_hash=md5_hash,
+            fast_fp=fast_fp,
+            filename=filename,
+            file_format=file_format,
+            municipality_id=municipality_id,
+            source_type=source_type,
+            source_identifier=source_identifier,
+            metadata=metadata,
+            file_path=file_path
+        )
+    
+    async def store_raw_files_batch(
+        self,
+        files: List[Dict[str, Any]],
+        compute_md5: bool = False
+    ) -> List[RawFile]:
+        """
+        Armazena vários arquivos RAW de uma vez
+        
+        Os hashes de todos os arquivos são calculados em paralelo (uma thread
+        por arquivo; hashlib libera o GIL) e depois todos os arquivos novos
+        são gravados em uma única transação.
+        
+        Args:
+            files: Lista de dicts com os argumentos de store_raw_file
+                (content, filename, file_format, municipality_id, source_type, ...)
+            compute_md5: Calcular também o MD5 de cada arquivo
+        
+        Returns:
+            Lista de RawFile na mesma ordem de files
+        """
+        hashes = await asyncio.gather(*(
+            asyncio.to_thread(RawFile.calculate_hashes, f["content"], compute_md5)
+            for f in files
+        ))
+        
+        return await asyncio.to_thread(self._persist_raw_files_bulk, files, hashes)
+    
+    def _store_raw_file_stream(
+        self,
+        source: Union[str, os.PathLike, BinaryIO],
+        filename: str,
+        file_format: str,
+        municipality_id: str,
+        source_type: str,
+        source_identifier: Optional[str] = None,
+        metadata: Optional[Dict[str, Any]] = None,
+        file_path: Optional[str] = None,
+        compute_md5: bool = False
+    ) -> RawFile:
+        """
+        Armazena arquivo RAW a partir de um caminho ou stream
+        
+        Os hashes são calculados lendo blocos de 1MB; streams são copiados
+        para file_path na mesma passada. Apenas arquivos pequenos (que vão
+        para o banco) são carregados inteiros na memória.
+        """
+        is_stream = hasattr(source, "read")
+        
+        if is_stream:
+            if not file_path:
+                raise ValueError("file_path é obrigatório para armazenar um stream")
+            sha256_hash, md5_hash, file_size = RawFile.calculate_hashes_from_stream(
+                source, copy_to=file_path, compute_md5=compute_md5
+            )
+            path = file_path
+        else:
+            path = os.fspath(source)
+            with open(path, 'rb') as f:
+                sha256_hash, md5_hash, file_size = RawFile.calculate_hashes_from_stream(
+                    f, compute_md5=compute_md5
+                )
+        
+        # Duplicata: checar antes de gravar qualquer cópia, e descartar a cópia
+        # do stream (a não ser que seja o próprio arquivo já registrado)
+        existing_file = self._lookup_by_hash(sha256_hash)
+        if existing_file:
+            if is_stream and not (
+                existing_file.file_path
+                and os.path.abspath(existing_file.file_path) == os.path.abspath(path)
+            ):
+                os.remove(path)
+            logger.info(f"📦 Arquivo já existe (SHA256: {sha256_hash[:16]}...)")
+            logger.info(f"   ID existente: {existing_file.id}")
+            return existing_file
+        
+        common = dict(
+            sha256_hash=sha256_hash,
+            md5_hash=md5_hash,
+            filename=filename,
+            file_format=file_format,
+            municipality_id=municipality_id,
+            source_type=source_type,
+            source_identifier=source_identifier,
+            metadata=metadata
+        )
+        
+        if file_size < MAX_DB_FILE_SIZE:
+            # Arquivo pequeno: vai para o banco (cópia temporária do stream é descartada)
+            with open(path, 'rb') as f:
+                content = f.read()
+            if is_stream:
+                os.remove(path)
+            return self._persist_raw_file(
+                content=content,
+                fast_fp=RawFile.calculate_fast_fp(content),
+                **common
+            )
+        
+        if file_path and not is_stream and os.path.abspath(file_path) != os.path.abspath(path):
+            shutil.copyfile(path, file_path)
+        
+        return self._persist_raw_file(
+            content=None,
+            file_path=file_path or path,
+            file_size=file_size,
+            fast_fp=RawFile.calculate_fast_fp_from_file(path),
+            **common
+        )
+    
+    def _find_duplicate(self, content: bytes, fast_fp: int) -> Optional[RawFile]:
+        """
+        Procura arquivo idêntico já armazenado usando o fingerprint rápido
+        
+        Candidatos com mesmo fingerprint e tamanho são confirmados comparando
+        o conteúdo byte a byte (bem mais barato que calcular o SHA256).
+        """
+        candidates = self.db.query(RawFile).filter(
+            RawFile.fast_fp == fast_fp,
+            RawFile.file_size_bytes == len(content)
+        ).all()
+        
+        for candidate in candidates:
+            try:
+                if self.get_file_content(candidate) == content:
+                    return candidate
+            except (ValueError, OSError) as e:
+                # Conteúdo do candidato indisponível: cair para o SHA256
+                logger.warning(f"⚠️ Não foi possível comparar com {candidate.id}: {e}")
+        
+        return None
+    
+    def _build_raw_file_rows(
+        self,
+        content: Optional[bytes],
+        sha256_hash: str,
+        md5_hash: Optional[str],
+        filename: str,
+        file_format: str,
+        municipality_id: str,
+        source_type: str,
+        source_identifier: Optional[str] = None,
+        metadata: Optional[Dict[str, Any]] = None,
+        file_path: Optional[str] = None,
+        fast_fp: Optional[int] = None,
+        file_size: Optional[int] = None
+    ) -> Tuple[RawFile, DataLineage]:
+        """
+        Cria (sem gravar) o RawFile e o lineage de upload
+        
+        O ID do RawFile é gerado aqui, para que o lineage possa referenciá-lo
+        sem um flush intermediário.
+        """
+        # Determinar se armazenar em DB ou filesystem
+        if content is not None:
+            file_size = len(content)
+        should_store_in_db = content is not None and file_size < MAX_DB_FILE_SIZE
+        
+        raw_file = RawFile(
+            id=generate_uuid(),
+            municipality_id=municipality_id,
+            source_type=source_type,
+            source_identifier=source_identifier,
+            filename=filename,
+            file_format=file_format.upper(),
+            file_content=content if should_store_in_db else None,
+            file_path=file_path if not should_store_in_db else None,
+            file_size_bytes=file_size,
+            sha256_hash=sha256_hash,
+            md5_hash=md5_hash,
+            fast_fp=fast_fp,
+            extra_metadata=metadata or {},
+            status="stored"
+        )
+        
+        lineage = DataLineage(
+            raw_file_id=raw_file.id,
+            operation="file_upload",
+            status="completed",
+            operation_details={
+                "source_type": source_type,
+                "source_identifier": source_identifier,
+                "filename": filename,
+                "file_format": file_format,
+                "file_size_bytes": file_size,
+                "stored_in_db": should_store_in_db
+            },
+            result={
+                "sha256_hash": sha256_hash,
+                "md5_hash": md5_hash,
+                "deduplication": False
+            },
+            completed_at=_utcnow()
+        )
+        
+        return raw_file, lineage
+    
+    def _persist_raw_files_bulk(
+        self,
+        files: List[Dict[str, Any]],
+        hashes: List[Tuple[str, Optional[str]]]
+    ) -> List[RawFile]:
+        """
+        Grava vários raw files (hashes já calculados) em uma única transação
+        
+        Duplicados (no banco ou dentro do próprio lote) retornam o registro
+        existente; em caso de erro nada do lote é gravado.
+        """
+        raw_files = []
+        new_rows = []
+        batch_files: Dict[str, RawFile] = {}
+        new_ids: Dict[str, str] = {}
+        
         try:
-            # 1. Calcular hashes
-            sha256_hash = RawFile.calculate_sha256(content)
-            md5_hash = RawFile.calculate_md5(content)
+            for f, (sha256_hash, md5_hash) in zip(files, hashes):
+                existing_file = batch_files.get(sha256_hash) or self._lookup_by_hash(sha256_hash)
+                if existing_file:
+                    raw_files.append(existing_file)
+                    continue
+                
+                raw_file, lineage = self._build_raw_file_rows(
+                    sha256_hash=sha256_hash,
+                    md5_hash=md5_hash,
+                    fast_fp=RawFile.calculate_fast_fp(f["content"]),
+                    **f
+                )
+                new_rows.append(raw_file)
+                new_rows.append(lineage)
+                batch_files[sha256_hash] = raw_file
+                new_ids[sha256_hash] = raw_file.id
+                raw_files.append(raw_file)
+            
+            self.db.add_all(new_rows)
+            self.db.commit()
             
+        except Exception as e:
+            self.db.rollback()
+            logger.error(f"❌ Erro ao armazenar lote de raw files: {e}")
+            raise
+        
+        for sha256_hash, raw_file_id in new_ids.items():
+            _remember_hash_id(sha256_hash, raw_file_id)
+        
+        logger.info(f"✅ Raw files stored: {len(new_ids)} novos de {len(files)}")
+        
+        return raw_files
+    
+    def _persist_raw_file(
+        self,
+        content: Optional[bytes],
+        sha256_hash: str,
+        md5_hash: Optional[str],
+        filename: str,
+        file_format: str,
+        municipality_id: str,
+        source_type: str,
+        source_identifier: Optional[str] = None,
+        metadata: Optional[Dict[str, Any]] = None,
+        file_path: Optional[str] = None,
+        fast_fp: Optional[int] = None,
+        file_size: Optional[int] = None
+    ) -> RawFile:
+        """
+        Grava o RawFile (com hashes já calculados) e o lineage de upload
+        
+        content pode ser None para arquivos grandes já gravados em file_path;
+        nesse caso file_size deve ser informado.
+        """
+        try:
             # 2. Verificar se arquivo já existe (deduplicação)
-            existing_file = self.db.query(RawFile).filter(
-                RawFile.sha256_hash == sha256_hash
-            ).first()
+            existing_file = self._lookup_by_hash(sha256_hash)
             
             if existing_file:
                 logger.info(f"📦 Arquivo já existe (SHA256: {sha256_hash[:16]}...)")
                 logger.info(f"   ID existente: {existing_file.id}")
                 return existing_file
             
-            # 3. Determinar se armazenar em DB ou filesystem
-            file_size = len(content)
-            should_store_in_db = file_size < (10 * 1024 * 1024)  # 10MB
-            
-            # 4. Criar objeto RawFile
-            raw_file = RawFile(
+            # 3-5. Criar RawFile e lineage de upload
+            raw_file, lineage = self._build_raw_file_rows(
+                content=content,
+                sha256_hash=sha256_hash,
+                md5_hash=md5_hash,
+                filename=filename,
+                file_format=file_format,
                 municipality_id=municipality_id,
                 source_type=source_type,
                 source_identifier=source_identifier,
-                filename=filename,
-                file_format=file_format.upper(),
-                file_content=content if should_store_in_db else None,
-                file_path=file_path if not should_store_in_db else None,
-                file_size_bytes=file_size,
-                sha256_hash=sha256_hash,
-                md5_hash=md5_hash,
-                extra_metadata=metadata or {},
-                status="stored"
+                metadata=metadata,
+                file_path=file_path,
+                fast_fp=fast_fp,
+                file_size=file_size
             )
             
-            self.db.add(raw_file)
-            self.db.flush()  # Para obter o ID
+            # Valores lidos antes do commit (depois dele o objeto expira e
+            # cada acesso recarregaria a linha)
+            raw_file_id = raw_file.id
+            file_size = raw_file.file_size_bytes
+            stored_in_db = raw_file.file_content is not None
             
-            # 5. Registrar lineage (file upload)
-            lineage = DataLineage(
-                raw_file_id=raw_file.id,
-                operation="file_upload",
-                status="completed",
-                operation_details={
-                    "source_type": source_type,
-                    "source_identifier": source_identifier,
-                    "filename": filename,
-                    "file_format": file_format,
-                    "file_size_bytes": file_size,
-                    "stored_in_db": should_store_in_db
-                },
-                result={
-                    "sha256_hash": sha256_hash,
-                    "md5_hash": md5_hash,
-                    "deduplication": False
-                },
-                completed_at=datetime.utcnow()
-            )
-            
-            self.db.add(lineage)
+            # Um único flush no commit insere os dois registros
+            self.db.add_all([raw_file, lineage])
             self.db.commit()
+            _remember_hash_id(sha256_hash, raw_file_id)
             
-            logger.info(f"✅ Raw file stored: {raw_file.id}")
+            logger.info(f"✅ Raw file stored: {raw_file_id}")
             logger.info(f"   SHA256: {sha256_hash[:16]}...")
             logger.info(f"   Size: {file_size:,} bytes")
-            logger.info(f"   Storage: {'PostgreSQL' if should_store_in_db else 'Filesystem'}")
+            logger.info(f"   Storage: {'PostgreSQL' if stored_in_db else 'Filesystem'}")
             
             return raw_file
             
@@ -136,7 +485,7 @@ class RawFileService:
                     "error": str(e)
                 },
                 error_message=str(e),
-                completed_at=datetime.utcnow()
+                completed_at=_utcnow()
             )
             
             self.db.add(lineage_fail)
@@ -150,9 +499,34 @@ class RawFileService:
     
     def get_raw_file_by_hash(self, sha256_hash: str) -> Optional[RawFile]:
         """Busca raw file por hash (para deduplicação)"""
-        return self.db.query(RawFile).filter(
+        return self._lookup_by_hash(sha256_hash)
+    
+    def _lookup_by_hash(self, sha256_hash: str) -> Optional[RawFile]:
+        """
+        Busca raw file por SHA256 passando pelo cache hash → id do processo
+        
+        Com o id em cache a busca é por chave primária, resolvida pelo
+        identity map da sessão sem ir ao banco quando o objeto já foi
+        carregado. Raw files nunca são removidos, então o cache não expira.
+        """
+        with _hash_id_lock:
+            raw_file_id = _hash_id_cache.get(sha256_hash)
+            if raw_file_id:
+                _hash_id_cache.move_to_end(sha256_hash)
+        
+        if raw_file_id:
+            raw_file = self.db.get(RawFile, raw_file_id)
+            if raw_file:
+                return raw_file
+        
+        raw_file = self.db.query(RawFile).filter(
             RawFile.sha256_hash == sha256_hash
         ).first()
+        
+        if raw_file:
+            _remember_hash_id(sha256_hash, raw_file.id)
+        
+        return raw_file
     
     def get_raw_files_by_source(
         self,
@@ -183,17 +557,30 @@ class RawFileService:
         Returns:
             bytes: Conteúdo do arquivo
         """
-        if raw_file.file_content:
-            # Arquivo está no PostgreSQL
-            return raw_file.file_content
+        with self.open_file_stream(raw_file) as f:
+            return f.read()
+    
+    def open_file_stream(self, raw_file: RawFile) -> BinaryIO:
+        """
+        Abre o conteúdo do arquivo como stream binário (sem copiar tudo para a memória)
         
-        elif raw_file.file_path:
+        Args:
+            raw_file: Objeto RawFile
+        
+        Returns:
+            BinaryIO: Stream do conteúdo (usar com `with`)
+        """
+        # file_path primeiro: file_content é deferred e acessá-lo gera um SELECT
+        if raw_file.file_path:
             # Arquivo está no filesystem
-            with open(raw_file.file_path, 'rb') as f:
-                return f.read()
+            return open(raw_file.file_path, 'rb')
         
-        else:
-            raise ValueError(f"Raw file {raw_file.id} não tem conteúdo nem caminho")
+        content = raw_file.file_content
+        if content:
+            # Arquivo está no PostgreSQL
+            return BytesIO(content)
+        
+        raise ValueError(f"Raw file {raw_file.id} não tem conteúdo nem caminho")
     
     def verify_integrity(self, raw_file: RawFile) -> bool:
         """
@@ -206,8 +593,16 @@ class RawFileService:
             bool: True se integridade OK
         """
         try:
-            content = self.get_file_content(raw_file)
-            current_hash = RawFile.calculate_sha256(content)
+            if raw_file.file_path:
+                # Filesystem: hash em streaming, sem carregar o arquivo inteiro
+                with self.open_file_stream(raw_file) as f:
+                    current_hash = hashlib.file_digest(f, "sha256").hexdigest()
+            else:
+                # PostgreSQL: hash direto sobre o buffer carregado
+                content = raw_file.file_content
+                if not content:
+                    raise ValueError(f"Raw file {raw_file.id} não tem conteúdo nem caminho")
+                current_hash = RawFile.calculate_sha256(memoryview(content))
             
             if current_hash != raw_file.sha256_hash:
                 logger.error(f"❌ INTEGRIDADE COMPROMETIDA!")
@@ -6,7 +6,7 @@ visuais (texto, gráficos, tabelas, métricas, etc).
 """
 
 from typing import List, Dict, Any, Optional
-from datetime import datetime
+from datetime import datetime, timezone
 
 from app.schemas.component_schemas import (
     TextComponent,
@@ -20,16 +20,70 @@ from app.schemas.component_schemas import (
 from app.schemas.request_schemas import GeminiResponse, ResponseData, ResponseMetadata
 
 
+NO_DATA_MESSAGE = """## Dados Insuficientes
+
+Não encontrei dados suficientes para responder sua pergunta com precisão.
+
+### Possíveis motivos:
+- Os documentos LOA/LDO ainda não foram carregados
+- O Portal da Transparência não possui dados para este período
+- A pergunta pode estar relacionada a informações não disponíveis
+
+### Sugestões:
+1. Verifique se os documentos LOA e LDO foram carregados
+2. Tente fazer uma pergunta mais específica
+3. Consulte o administrador do sistema
+"""
+
+# Resposta "sem dados" é o fallback mais frequente: valida os componentes uma única vez
+_NO_DATA_TEXT = TextComponent(type="text", content=NO_DATA_MESSAGE)
+_NO_DATA_ALERT = AlertComponent(
+    type="alert",
+    level="warning",
+    message="Dados insuficientes para responder"
+)
+_NO_DATA_SUGGESTIONS = (
+    "Quais documentos estão disponíveis?",
+    "Como carregar os documentos LOA e LDO?",
+    "Que tipo de perguntas posso fazer?",
+)
+
+
+def _utc_timestamp() -> str:
+    """Timestamp ISO 8601 em UTC com milissegundos e sufixo "Z"."""
+    return datetime.now(timezone.utc).isoformat(timespec="milliseconds")[:-6] + "Z"
+
+
 class ResponseBuilder:
     """Builder para construir respostas estruturadas."""
 
+    # Um builder é criado por requisição: sem __dict__ por instância
+    __slots__ = (
+        "components",
+        "confidence",
+        "processing_time_ms",
+        "_sources",
+        "_suggestions",
+    )
+
     def __init__(self):
         """Inicializa o builder."""
         self.components: List[Any] = []
-        self.sources: List[str] = []
-        self.suggestions: List[str] = []
         self.confidence: str = "high"
         self.processing_time_ms: int = 0
+        # Dicts preservam a ordem de inserção e deduplicam em O(1)
+        self._sources: Dict[str, None] = {}
+        self._suggestions: Dict[str, None] = {}
+
+    @property
+    def sources(self) -> List[str]:
+        """Fontes adicionadas, na ordem de inserção."""
+        return list(self._sources)
+
+    @property
+    def suggestions(self) -> List[str]:
+        """Sugestões adicionadas, na ordem de inserção."""
+        return list(self._suggestions)
 
     def add_text(self, content: str) -> "ResponseBuilder":
         """
@@ -215,8 +269,7 @@ class ResponseBuilder:
         Returns:
             Self para chaining
         """
-        if source not in self.sources:
-            self.sources.append(source)
+        self._sources[source] = None
         return self
 
     def add_sources(self, sources: List[str]) -> "ResponseBuilder":
@@ -229,8 +282,7 @@ class ResponseBuilder:
         Returns:
             Self para chaining
         """
-        for source in sources:
-            self.add_source(source)
+        self._sources.update(dict.fromkeys(sources))
         return self
 
     def add_suggestion(self, suggestion: str) -> "ResponseBuilder":
@@ -243,8 +295,7 @@ class ResponseBuilder:
         Returns:
             Self para chaining
         """
-        if suggestion not in self.suggestions:
-            self.suggestions.append(suggestion)
+        self._suggestions[suggestion] = None
         return self
 
     def add_suggestions(self, suggestions: List[str]) -> "ResponseBuilder":
@@ -257,8 +308,7 @@ class ResponseBuilder:
         Returns:
             Self para chaining
         """
-        for suggestion in suggestions:
-            self.add_suggestion(suggestion)
+        self._suggestions.update(dict.fromkeys(suggestions))
         return self
 
     def set_confidence(self, confidence: str) -> "ResponseBuilder":
@@ -299,14 +349,14 @@ class ResponseBuilder:
         """
         return GeminiResponse(
             session_id=session_id,
-            timestamp=datetime.utcnow().isoformat() + "Z",
+            timestamp=_utc_timestamp(),
             response=ResponseData(
                 components=self.components,
                 metadata=ResponseMetadata(
-                    sources=self.sources,
+                    sources=list(self._sources),
                     confidence=self.confidence,
                     processing_time_ms=self.processing_time_ms,
-                    suggestions=self.suggestions
+                    suggestions=list(self._suggestions)
                 )
             )
         )
@@ -349,33 +399,14 @@ class ResponseBuilder:
         Returns:
             GeminiResponse indicando falta de dados
         """
-        self.components = []
-        
-        default_message = """## Dados Insuficientes
-
-Não encontrei dados suficientes para responder sua pergunta com precisão.
-
-### Possíveis motivos:
-- Os documentos LOA/LDO ainda não foram carregados
-- O Portal da Transparência não possui dados para este período
-- A pergunta pode estar relacionada a informações não disponíveis
-
-### Sugestões:
-1. Verifique se os documentos LOA e LDO foram carregados
-2. Tente fazer uma pergunta mais específica
-3. Consulte o administrador do sistema
-"""
-        
-        self.add_text(message or default_message)
-        self.add_alert("warning", "Dados insuficientes para responder")
+        # Componentes padrão são pré-validados no import e apenas referenciados
+        if message:
+            self.components = [TextComponent(type="text", content=message), _NO_DATA_ALERT]
+        else:
+            self.components = [_NO_DATA_TEXT, _NO_DATA_ALERT]
         self.set_confidence("low")
-        
-        self.add_suggestions([
-            "Quais documentos estão disponíveis?",
-            "Como carregar os documentos LOA e LDO?",
-            "Que tipo de perguntas posso fazer?"
-        ])
-        
+        self.add_suggestions(_NO_DATA_SUGGESTIONS)
+
         return self.build(session_id)
 
     def clear(self) -> "ResponseBuilder":
@@ -386,8 +417,8 @@ Não encontrei dados suficientes para responder sua pergunta com precisão.
             Self para chaining
         """
         self.components = []
-        self.sources = []
-        self.suggestions = []
+        self._sources = {}
+        self._suggestions = {}
         self.confidence = "high"
         self.processing_time_ms = 0
         return self
@@ -3,20 +3,149 @@ Serviço para descoberta automática de schemas
 FASE 2: Elasticidade de nomes de colunas
 """
 
+import asyncio
+import csv
+import hashlib
 import logging
+import os
 import re
-from typing import Dict, Any, List, Optional, Set
+import sys
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from functools import cached_property, lru_cache
+from typing import Dict, Any, List, Optional, Set, BinaryIO, Tuple, Union
 from datetime import datetime
+from sqlalchemy import or_, select
 from sqlalchemy.orm import Session
-from io import StringIO
+from io import BytesIO, StringIO
 import pandas as pd
+import pyarrow as pa
+import pyarrow.csv as pacsv
 from unidecode import unidecode
 
-from app.models.file_schema import FileSchema, SchemaAlias
+from app.models.file_schema import FileSchema, SchemaAlias, generate_uuid
 from app.models.raw_file import RawFile
+from app.services.resource_parser import ResourceParser
 
 logger = logging.getLogger(__name__)
 
+# Regexes usadas em toda coluna (compiladas uma vez no import)
+_RE_NON_ALNUM = re.compile(r'[^a-z0-9\s]')
+_RE_WS = re.compile(r'\s+')
+_RE_UND = re.compile(r'_+')
+_RE_DEG = re.compile(r'[°º]')
+_RE_WORD = re.compile(r'\w+')
+_RE_NUM_FMT = re.compile(r'\d+[,\.]\d+')
+_RE_DIGITS = re.compile(r'\d{1,4}')
+_RE_ALIAS_TOKEN = re.compile(r'[a-z0-9]+')
+# Prefixo de texto que pd.to_numeric pode converter (dígito, ".dígito" ou
+# "inf", após espaços/sinal); o que não casa certamente vira NaN
+_RE_NUMERIC_PREFIX = re.compile(r'\s*[-+]?(?:\.?\d|inf)', re.IGNORECASE)
+
+# Palavras-chave da assinatura de conteúdo (testadas na amostra em maiúsculas)
+_ORG_KEYWORDS = ('SEINF', 'SME', 'SMS', 'SECRETARIA', 'INSTITUTO', 'URBFOR', 'IJF')
+_MODAL_KEYWORDS = ('PREGAO', 'CONCORRENCIA', 'DISPENSA', 'INEXIGIBILIDADE', 'PE', 'CE')
+_MONEY_MARKERS = ('R$', 'RS')
+_DATE_SEPARATORS = ('/', '-')
+
+# Aliases por assinatura de conteúdo e por palavra-chave (substring) no nome
+_SIGNATURE_ALIASES = {
+    "numeric_sequential": frozenset({"numero", "number", "id", "codigo", "code"}),
+    "organization_name": frozenset({"orgao", "origem", "secretaria", "entidade",
+                                    "organization", "department", "entity"}),
+    "bidding_modality": frozenset({"modalidade", "modality", "tipo", "type"}),
+    "money": frozenset({"valor", "preco", "custo", "montante",
+                        "value", "price", "cost", "amount"}),
+    "date": frozenset({"data", "date", "quando", "when", "dia"}),
+}
+_KW_GROUPS = (
+    (('edital', 'licitacao'), frozenset({"edital", "licitacao", "bidding", "tender"})),
+    (('processo', 'proc'), frozenset({"processo", "process", "proc"})),
+    (('objeto', 'descricao'), frozenset({"objeto", "descricao", "description", "object"})),
+    (('situacao', 'status'), frozenset({"situacao", "status", "state"})),
+)
+
+# Colunas de schema_aliases gravadas via COPY (na ordem do buffer)
+SCHEMA_ALIAS_COPY_COLUMNS = (
+    "id", "file_schema_id", "alias", "original_column_name", "match_type", "confidence", "created_at"
+)
+_SCHEMA_ALIAS_COPY_SQL = (
+    f"COPY {SchemaAlias.__tablename__} ({', '.join(SCHEMA_ALIAS_COPY_COLUMNS)}) FROM STDIN"
+)
+
+# Cabeçalhos se repetem entre arquivos: normalizações de nomes ficam em cache
+NAME_CACHE_SIZE = 4096
+
+# Pool compartilhado para analisar colunas em paralelo (kernels pandas/Arrow liberam o GIL)
+_COLUMN_EXEC = ThreadPoolExecutor(
+    max_workers=min(8, os.cpu_count() or 1), thread_name_prefix="schema-col"
+)
+
+
+def _numeric_candidate_mask(values: pd.Series) -> pd.Series:
+    """
+    Valores que podem converter para número (superconjunto do que
+    pd.to_numeric aceita); valores não-texto contam como candidatos
+    """
+    try:
+        return values.str.match(_RE_NUMERIC_PREFIX).fillna(True).astype(bool)
+    except AttributeError:
+        # Coluna numérica/não-texto: sem filtro
+        return pd.Series(True, index=values.index)
+
+
+@dataclass
+class _ColumnProbe:
+    """
+    Intermediários da análise de uma coluna, calculados uma única vez
+    e compartilhados entre inferência de tipo, assinatura e aliases
+    """
+    nonnull: pd.Series
+    
+    @classmethod
+    def from_nonnull(cls, nonnull: pd.Series, unique_count: Optional[int] = None) -> "_ColumnProbe":
+        """Probe a partir de valores não-nulos (e contagem de únicos, se já calculada)"""
+        probe = cls(nonnull=nonnull)
+        if unique_count is not None:
+            probe.__dict__["unique_count"] = unique_count
+        return probe
+    
+    @cached_property
+    def numeric(self) -> pd.Series:
+        """Valores não-nulos convertidos para número (NaN onde não converte)"""
+        return pd.to_numeric(self.nonnull, errors='coerce')
+    
+    @cached_property
+    def numeric_candidates(self) -> int:
+        """Limite superior de valores convertíveis para número"""
+        return int(_numeric_candidate_mask(self.nonnull).sum())
+    
+    @cached_property
+    def sample10_numeric(self) -> Optional[pd.Series]:
+        """
+        Primeiros 10 valores convertidos para número, ou None se algum
+        certamente não converte (evita a coerção em colunas de texto)
+        """
+        if not _numeric_candidate_mask(self.sample10).all():
+            return None
+        if "numeric" in self.__dict__:
+            return self.numeric.head(10)
+        return pd.to_numeric(self.sample10, errors='coerce')
+    
+    @cached_property
+    def dt(self) -> pd.Series:
+        """Valores não-nulos convertidos para data (NaT onde não converte)"""
+        return pd.to_datetime(self.nonnull, errors='coerce', dayfirst=True)
+    
+    @cached_property
+    def unique_count(self) -> int:
+        return int(self.nonnull.nunique())
+    
+    @cached_property
+    def sample10(self) -> pd.Series:
+        """Primeiros 10 valores não-nulos"""
+        return self.nonnull.head(10)
+
 
 class SchemaDiscoveryService:
     """
@@ -24,21 +153,51 @@ class SchemaDiscoveryService:
     e gera aliases semânticos inteligentes
     """
     
+    # Linhas por bloco na leitura do CSV: só o primeiro bloco fica em memória
+    # e é usado na análise das colunas; os demais são apenas contados
+    CHUNK_ROWS = 50_000
+    
+    # Inferência de tipo/assinatura em uma amostra limitada de cada coluna
+    # ("head": primeiras linhas; "random": amostra aleatória reprodutível).
+    # Contagens de nulos e de valores únicos continuam exatas.
+    SAMPLE_ROWS = 10_000
+    SAMPLE_METHOD = "head"
+    
+    # Abaixo disso as colunas são analisadas em sequência (overhead do pool não compensa)
+    MIN_COLS_FOR_PARALLEL = 8
+    
+    # Máximo de descobertas (leitura + análise das colunas) simultâneas em threads
+    MAX_CONCURRENT_DISCOVERIES = 4
+    _discovery_semaphore: Optional[asyncio.Semaphore] = None
+    
     def __init__(self, db: Session):
         self.db = db
     
+    @classmethod
+    def _get_discovery_semaphore(cls) -> asyncio.Semaphore:
+        """Semáforo que limita descobertas concorrentes (criado sob demanda)"""
+        if cls._discovery_semaphore is None:
+            cls._discovery_semaphore = asyncio.Semaphore(cls.MAX_CONCURRENT_DISCOVERIES)
+        return cls._discovery_semaphore
+    
     async def discover_schema(
         self,
         raw_file: RawFile,
-        content: str,
+        content: Union[str, bytes, os.PathLike, BinaryIO],
         delimiter: str = ";"
     ) -> FileSchema:
         """
         Descobre schema de um arquivo CSV
         
+        O CSV é lido em blocos de CHUNK_ROWS linhas: as colunas são analisadas
+        no primeiro bloco e o restante do arquivo é apenas contado. Leitura e
+        análise rodam em thread (fora do event loop), limitadas por
+        MAX_CONCURRENT_DISCOVERIES.
+        
         Args:
             raw_file: Objeto RawFile
-            content: Conteúdo do arquivo
+            content: Conteúdo do arquivo (str ou bytes UTF-8), caminho
+                (os.PathLike) ou stream binário
             delimiter: Delimitador do CSV
         
         Returns:
@@ -47,41 +206,38 @@ class SchemaDiscoveryService:
         try:
             logger.info(f"🔍 Discovering schema: {raw_file.filename}")
             
-            # 1. Parse CSV com pandas
-            df = pd.read_csv(StringIO(content), delimiter=delimiter, encoding='utf-8')
-            
-            # 2. Descobrir informações de cada coluna
-            columns_info = []
+            # 0. Reutilizar schema de arquivo com cabeçalho idêntico
+            header_hash = await asyncio.to_thread(self._compute_header_hash, content)
+            existing_schema = self.db.query(FileSchema).filter(
+                FileSchema.header_hash == header_hash,
+                FileSchema.status == "active"
+            ).first()
             
-            for col_name in df.columns:
-                col_info = self._discover_column_info(col_name, df[col_name])
-                columns_info.append(col_info)
+            if existing_schema:
+                raw_file.file_schema_id = existing_schema.id
+                self.db.commit()
                 
-                logger.debug(
-                    f"   Column: {col_name} → {col_info['data_type']} "
-                    f"({len(col_info['semantic_aliases'])} aliases)"
+                logger.info(
+                    f"♻️ Reusing schema {existing_schema.id} for {raw_file.filename} "
+                    f"(same header as {existing_schema.filename})"
+                )
+                return existing_schema
+            
+            # 1-2. Parse CSV e análise das colunas: CPU, fora do event loop
+            async with self._get_discovery_semaphore():
+                columns_info, total_rows, sample_rows, discovery_method = await asyncio.to_thread(
+                    self._discover_sync, content, delimiter
                 )
             
             # 3. Criar FileSchema
-            file_schema = FileSchema(
-                raw_file_id=raw_file.id,
-                filename=raw_file.filename,
-                file_format="CSV",
-                columns_info=columns_info,
-                total_rows=len(df),
-                total_columns=len(df.columns),
-                discovery_metadata={
-                    "delimiter": delimiter,
-                    "encoding": "utf-8",
-                    "has_header": True,
-                    "discovery_method": "pandas",
-                    "discovery_version": "2.0"
-                },
-                status="active"
+            file_schema = self._build_file_schema(
+                raw_file, header_hash, delimiter,
+                columns_info, total_rows, sample_rows, discovery_method
             )
             
             self.db.add(file_schema)
             self.db.flush()
+            raw_file.file_schema_id = file_schema.id
             
             # 4. Criar índice de aliases (para busca rápida)
             await self._create_alias_index(file_schema)
@@ -90,7 +246,7 @@ class SchemaDiscoveryService:
             
             logger.info(
                 f"✅ Schema discovered: {raw_file.filename} "
-                f"({len(columns_info)} columns, {len(df)} rows)"
+                f"({len(columns_info)} columns, {total_rows} rows)"
             )
             
             return file_schema
@@ -100,6 +256,296 @@ class SchemaDiscoveryService:
             logger.error(f"❌ Error discovering schema: {e}")
             raise
     
+    async def discover_schemas(
+        self,
+        raw_files: List[RawFile],
+        contents: List[Union[str, bytes, os.PathLike, BinaryIO]],
+        delimiter: str = ";"
+    ) -> List[FileSchema]:
+        """
+        Descobre schemas de vários arquivos CSV em lote
+        
+        Cabeçalhos já conhecidos são resolvidos em uma única consulta; os
+        demais arquivos são analisados em paralelo (limitados por
+        MAX_CONCURRENT_DISCOVERIES) e todos os schemas e aliases são gravados
+        em uma única transação, com um só flush e um só commit.
+        
+        Args:
+            raw_files: Objetos RawFile
+            contents: Conteúdo de cada arquivo (mesma ordem de raw_files)
+            delimiter: Delimitador dos CSVs
+        
+        Returns:
+            FileSchemas na ordem de raw_files (reutilizados ou criados)
+        """
+        if len(raw_files) != len(contents):
+            raise ValueError("raw_files e contents devem ter o mesmo tamanho")
+        
+        try:
+            logger.info(f"🔍 Discovering schemas: {len(raw_files)} files")
+            
+            # 0. Reutilizar schemas de cabeçalhos já conhecidos (uma consulta)
+            header_hashes = await asyncio.gather(*(
+                asyncio.to_thread(self._compute_header_hash, content)
+                for content in contents
+            ))
+            schemas_by_hash: Dict[str, FileSchema] = {
+                schema.header_hash: schema
+                for schema in self.db.query(FileSchema).filter(
+                    FileSchema.header_hash.in_(set(header_hashes)),
+                    FileSchema.status == "active"
+                )
+            }
+            
+            # Um arquivo por cabeçalho novo (header_hash é único no banco)
+            pending: Dict[str, int] = {}
+            for index, header_hash in enumerate(header_hashes):
+                if header_hash not in schemas_by_hash:
+                    pending.setdefault(header_hash, index)
+            
+            # 1-2. Parse e análise das colunas em paralelo, fora do event loop
+            semaphore = self._get_discovery_semaphore()
+            
+            async def discover(index: int):
+                async with semaphore:
+                    return await asyncio.to_thread(
+                        self._discover_sync, contents[index], delimiter
+                    )
+            
+            discovered = await asyncio.gather(*(discover(index) for index in pending.values()))
+            
+            # 3. Criar todos os FileSchemas e aliases na mesma transação
+            new_schemas = [
+                self._build_file_schema(raw_files[index], header_hash, delimiter, *result)
+                for (header_hash, index), result in zip(pending.items(), discovered)
+            ]
+            alias_rows: List[Dict[str, Any]] = []
+            if new_schemas:
+                self.db.add_all(new_schemas)
+                self.db.flush()
+                
+                # 4. Índice de aliases de todos os schemas em uma única escrita
+                alias_rows = [
+                    row for schema in new_schemas for row in self._build_alias_rows(schema)
+                ]
+                self._write_aliases(alias_rows)
+                schemas_by_hash.update((schema.header_hash, schema) for schema in new_schemas)
+            
+            # 5. Associar cada arquivo ao seu schema (novo ou reutilizado)
+            for raw_file, header_hash in zip(raw_files, header_hashes):
+                raw_file.file_schema_id = schemas_by_hash[header_hash].id
+            
+            self.db.commit()
+            
+            logger.info(
+                f"✅ Schemas discovered: {len(new_schemas)} new, "
+                f"{len(raw_files) - len(new_schemas)} reused ({len(alias_rows)} aliases)"
+            )
+            
+            return [schemas_by_hash[header_hash] for header_hash in header_hashes]
+            
+        except Exception as e:
+            self.db.rollback()
+            logger.error(f"❌ Error discovering schemas: {e}")
+            raise
+    
+    def _build_file_schema(
+        self,
+        raw_file: RawFile,
+        header_hash: str,
+        delimiter: str,
+        columns_info: List[Dict[str, Any]],
+        total_rows: int,
+        sample_rows: int,
+        discovery_method: str
+    ) -> FileSchema:
+        """FileSchema (ainda não persistido) a partir do resultado de _discover_sync"""
+        return FileSchema(
+            raw_file_id=raw_file.id,
+            filename=raw_file.filename,
+            file_format="CSV",
+            columns_info=columns_info,
+            total_rows=total_rows,
+            total_columns=len(columns_info),
+            header_hash=header_hash,
+            discovery_metadata={
+                "delimiter": delimiter,
+                "encoding": "utf-8",
+                "has_header": True,
+                "discovery_method": discovery_method,
+                "sample_rows": sample_rows,
+                "discovery_version": "2.0"
+            },
+            status="active"
+        )
+    
+    def _discover_sync(
+        self,
+        content: Union[str, bytes, os.PathLike, BinaryIO],
+        delimiter: str
+    ) -> Tuple[List[Dict[str, Any]], int, int, str]:
+        """
+        Parte síncrona da descoberta (sem acesso ao banco)
+        
+        Returns:
+            (columns_info, total de linhas, linhas na amostra, método de leitura)
+        """
+        # 1. Parse CSV em blocos (o primeiro bloco é a amostra)
+        df, total_rows, discovery_method = self._read_csv_sample(content, delimiter)
+        
+        # 2. Descobrir informações de cada coluna (independentes entre si)
+        columns_info = self._discover_columns(df)
+        
+        for col_info in columns_info:
+            logger.debug(
+                f"   Column: {col_info['original_name']} → {col_info['data_type']} "
+                f"({len(col_info['semantic_aliases'])} aliases)"
+            )
+        
+        return columns_info, total_rows, len(df), discovery_method
+    
+    def _read_csv_sample(
+        self,
+        content: Union[str, bytes, os.PathLike, BinaryIO],
+        delimiter: str
+    ) -> Tuple[pd.DataFrame, int, str]:
+        """
+        Lê as primeiras CHUNK_ROWS linhas do CSV e conta as linhas do arquivo
+        
+        Usa o leitor em streaming do PyArrow com todas as colunas como string
+        (a inferência de tipo é feita depois, coluna a coluna); se o PyArrow
+        falhar (encoding, colunas duplicadas, ...), usa o pandas.
+        
+        Returns:
+            (DataFrame com a amostra, total de linhas, método usado)
+        """
+        start = content.tell() if hasattr(content, "read") else None
+        
+        try:
+            df, total_rows = self._read_csv_sample_arrow(content, delimiter)
+            return df, total_rows, "pyarrow"
+        except Exception as e:
+            logger.warning(f"PyArrow CSV read failed, falling back to pandas: {e}")
+            if start is not None:
+                content.seek(start)
+        
+        reader = pd.read_csv(
+            self._as_csv_source(content),
+            delimiter=delimiter,
+            encoding='utf-8',
+            chunksize=self.CHUNK_ROWS
+        )
+        with reader:
+            df = next(reader)
+            total_rows = len(df) + sum(len(chunk) for chunk in reader)
+        return df, total_rows, "pandas"
+    
+    def _read_csv_sample_arrow(
+        self,
+        content: Union[str, bytes, os.PathLike, BinaryIO],
+        delimiter: str
+    ) -> Tuple[pd.DataFrame, int]:
+        """
+        Leitura em streaming com o PyArrow: só os batches da amostra ficam
+        em memória, os demais são apenas contados
+        """
+        header = self._read_header_line(content).lstrip("\ufeff")
+        column_names = next(csv.reader([header], delimiter=delimiter), [])
+        if len(set(column_names)) != len(column_names):
+            raise ValueError("nomes de colunas duplicados no cabeçalho")
+        
+        if isinstance(content, str):
+            source = pa.BufferReader(content.encode("utf-8"))
+        elif isinstance(content, (bytes, bytearray)):
+            source = pa.BufferReader(pa.py_buffer(content))
+        elif hasattr(content, "read"):
+            source = content
+        else:
+            source = os.fspath(content)
+        
+        reader = pacsv.open_csv(
+            source,
+            parse_options=pacsv.ParseOptions(
+                delimiter=delimiter,
+                newlines_in_values=True
+            ),
+            convert_options=pacsv.ConvertOptions(
+                column_types={name: pa.string() for name in column_names},
+                strings_can_be_null=True
+            )
+        )
+        
+        # Garantir que nenhuma coluna escapou do tipo string
+        if not all(pa.types.is_string(field.type) for field in reader.schema):
+            raise ValueError("coluna não lida como string")
+        
+        batches = []
+        total_rows = 0
+        for batch in reader:
+            if total_rows < self.CHUNK_ROWS:
+                batches.append(batch)
+            total_rows += batch.num_rows
+        
+        table = pa.Table.from_batches(batches, schema=reader.schema).slice(0, self.CHUNK_ROWS)
+        return table.to_pandas(), total_rows
+    
+    @staticmethod
+    def _as_csv_source(
+        content: Union[str, bytes, os.PathLike, BinaryIO]
+    ) -> Union[StringIO, BytesIO, os.PathLike, BinaryIO]:
+        """Adapta o conteúdo para pd.read_csv (caminhos e streams passam direto)"""
+        if isinstance(content, str):
+            return StringIO(content)
+        if isinstance(content, (bytes, bytearray)):
+            return BytesIO(content)
+        return content
+    
+    @staticmethod
+    def _read_header_line(content: Union[str, bytes, os.PathLike, BinaryIO]) -> str:
+        """
+        Primeira linha do CSV, sem a quebra de linha
+        
+        Para caminhos e streams, lê apenas a primeira linha (o stream
+        volta para a posição original).
+        """
+        if isinstance(content, str):
+            header_end = content.find("\n")
+            return content if header_end == -1 else content[:header_end]
+        
+        if isinstance(content, (bytes, bytearray)):
+            header_end = content.find(b"\n")
+            header_bytes = content if header_end == -1 else content[:header_end]
+        elif hasattr(content, "read"):
+            position = content.tell()
+            header_bytes = content.readline()
+            content.seek(position)
+        else:
+            with open(content, 'rb') as f:
+                header_bytes = f.readline()
+        return bytes(header_bytes).decode("utf-8").rstrip("\n")
+    
+    @staticmethod
+    def _compute_header_hash(content: Union[str, bytes, os.PathLike, BinaryIO]) -> str:
+        """
+        Calcula hash da linha de cabeçalho do CSV
+        
+        Arquivos com o mesmo cabeçalho compartilham o mesmo schema
+        """
+        header = SchemaDiscoveryService._read_header_line(content)
+        return hashlib.blake2b(header.strip().encode("utf-8")).hexdigest()
+    
+    def _discover_columns(self, df: pd.DataFrame) -> List[Dict[str, Any]]:
+        """
+        Descobre informações de todas as colunas, na ordem do DataFrame
+        
+        Com MIN_COLS_FOR_PARALLEL colunas ou mais, a análise é distribuída
+        no pool compartilhado de threads.
+        """
+        columns = [(col_name, df[col_name]) for col_name in df.columns]
+        if len(columns) < self.MIN_COLS_FOR_PARALLEL:
+            return [self._discover_column_info(name, data) for name, data in columns]
+        return list(_COLUMN_EXEC.map(lambda col: self._discover_column_info(*col), columns))
+    
     def _discover_column_info(
         self,
         column_name: str,
@@ -121,25 +567,40 @@ class SchemaDiscoveryService:
         # Display name (limpo)
         display_name = self._clean_display_name(column_name)
         
+        # Estatísticas exatas da coluna: máscara de nulos calculada uma vez só
+        isna = column_data.isna()
+        nonnull = column_data[~isna]
+        null_count = int(isna.sum())
+        # Um único hash da coluna: a contagem exata sai dos próprios valores únicos
+        uniques = nonnull.unique()
+        unique_count = len(uniques)
+        
+        # Conversões numérica/data feitas uma vez só, sobre a amostra dos
+        # valores não-nulos; se a amostra é a coluna inteira, reaproveita nunique
+        sample = self._sample_column(nonnull)
+        probe = _ColumnProbe.from_nonnull(
+            sample,
+            unique_count if sample is nonnull else None
+        )
+        
         # Tipo de dados
-        data_type = self._infer_data_type(column_data)
+        data_type = self._infer_data_type(probe)
         
         # Valores de exemplo (primeiros 5 não-nulos)
-        sample_values = column_data.dropna().head(5).tolist()
+        sample_values = probe.nonnull.head(5).tolist()
         
         # Para categorias, pegar valores únicos (se <= 50)
         unique_values = None
-        unique_count = column_data.nunique()
         if unique_count <= 50:
-            unique_values = column_data.dropna().unique().tolist()
+            unique_values = uniques.tolist()
         
         # Assinatura de conteúdo (inferir significado)
-        content_signature = self._analyze_content_signature(column_data)
+        content_signature = self._analyze_content_signature(probe)
         
         # CRÍTICO: Gerar aliases semânticos
         semantic_aliases = self._generate_semantic_aliases(
             column_name,
-            column_data,
+            probe,
             content_signature
         )
         
@@ -152,11 +613,23 @@ class SchemaDiscoveryService:
             "sample_values": sample_values,
             "unique_values": unique_values,
             "content_signature": content_signature,
-            "null_count": int(column_data.isna().sum()),
+            "null_count": null_count,
             "unique_count": unique_count
         }
     
-    def _normalize_column_name(self, column_name: str) -> str:
+    def _sample_column(self, column_data: pd.Series) -> pd.Series:
+        """
+        Amostra de até SAMPLE_ROWS valores (não-nulos) da coluna, na ordem original
+        """
+        if len(column_data) <= self.SAMPLE_ROWS:
+            return column_data
+        if self.SAMPLE_METHOD == "random":
+            return column_data.sample(n=self.SAMPLE_ROWS, random_state=0).sort_index()
+        return column_data.head(self.SAMPLE_ROWS)
+    
+    @staticmethod
+    @lru_cache(maxsize=NAME_CACHE_SIZE)
+    def _normalize_column_name(column_name: str) -> str:
         """
         Normaliza nome da coluna
         
@@ -169,44 +642,52 @@ class SchemaDiscoveryService:
         normalized = normalized.lower()
         
         # Remove caracteres especiais, mantém apenas letras, números e espaços
-        normalized = re.sub(r'[^a-z0-9\s]', '', normalized)
+        normalized = _RE_NON_ALNUM.sub('', normalized)
         
         # Substitui espaços por underscore
-        normalized = re.sub(r'\s+', '_', normalized)
+        normalized = _RE_WS.sub('_', normalized)
         
         # Remove underscores duplicados
-        normalized = re.sub(r'_+', '_', normalized)
+        normalized = _RE_UND.sub('_', normalized)
         
         # Remove underscores no início e fim
         normalized = normalized.strip('_')
         
         return normalized
     
-    def _clean_display_name(self, column_name: str) -> str:
+    @staticmethod
+    @lru_cache(maxsize=NAME_CACHE_SIZE)
+    def _clean_display_name(column_name: str) -> str:
         """
         Limpa nome para display
         
         "EDITAL N°" → "Edital N"
         """
         # Remove caracteres especiais problemáticos
-        cleaned = re.sub(r'[°º]', '', column_name)
+        cleaned = _RE_DEG.sub('', column_name)
         
         # Remove espaços extras
-        cleaned = re.sub(r'\s+', ' ', cleaned).strip()
+        cleaned = _RE_WS.sub(' ', cleaned).strip()
         
         # Capitalize primeira letra de cada palavra
         cleaned = ' '.join(word.capitalize() for word in cleaned.split())
         
         return cleaned
     
-    def _infer_data_type(self, column_data: pd.Series) -> str:
+    def _infer_data_type(self, probe: _ColumnProbe) -> str:
         """
         Infere tipo de dados da coluna
         """
-        # Tentar converter para numérico
+        nonnull_count = len(probe.nonnull)
+        if nonnull_count == 0:
+            # Coluna vazia: nada a inferir
+            return "text"
+        
+        # Tentar converter para numérico (só se o pré-filtro deixa chance de 80%)
         try:
-            numeric_data = pd.to_numeric(column_data.dropna(), errors='coerce')
-            if numeric_data.notna().sum() > len(column_data.dropna()) * 0.8:
+            if (probe.numeric_candidates > nonnull_count * 0.8
+                    and probe.numeric.notna().sum() > nonnull_count * 0.8):
+                numeric_data = probe.numeric
                 # Se 80%+ são numéricos
                 if (numeric_data % 1 == 0).all():
                     return "integer"
@@ -217,33 +698,32 @@ class SchemaDiscoveryService:
         
         # Tentar converter para data
         try:
-            date_data = pd.to_datetime(column_data.dropna(), errors='coerce', dayfirst=True)
-            if date_data.notna().sum() > len(column_data.dropna()) * 0.8:
+            if probe.dt.notna().sum() > nonnull_count * 0.8:
                 return "date"
         except:
             pass
         
         # Se tem poucos valores únicos, é categoria
-        unique_ratio = column_data.nunique() / len(column_data.dropna())
+        unique_ratio = probe.unique_count / nonnull_count
         if unique_ratio < 0.05:  # Menos de 5% de valores únicos
             return "category"
         
         return "text"
     
-    def _analyze_content_signature(self, column_data: pd.Series) -> str:
+    def _analyze_content_signature(self, probe: _ColumnProbe) -> str:
         """
         Analisa CONTEÚDO da coluna para inferir significado
         """
         # Pegar amostra não-nula
-        sample = column_data.dropna().head(10)
+        sample = probe.sample10
         
         if len(sample) == 0:
             return "unknown"
         
         # Testar se são números sequenciais (IDs, editais)
         try:
-            numeric_sample = pd.to_numeric(sample, errors='coerce')
-            if numeric_sample.notna().all():
+            numeric_sample = probe.sample10_numeric
+            if numeric_sample is not None and numeric_sample.notna().all():
                 if numeric_sample.is_monotonic_increasing:
                     return "numeric_sequential"
                 return "numeric"
@@ -251,36 +731,46 @@ class SchemaDiscoveryService:
             pass
         
         # Converter para string para análise
-        sample_str = ' '.join(sample.astype(str).tolist()).upper()
+        sample_str = sample.astype(str).str.cat(sep=' ').upper()
         
         # Testar se são nomes de organizações
-        org_keywords = ['SEINF', 'SME', 'SMS', 'SECRETARIA', 'INSTITUTO', 'URBFOR', 'IJF']
-        if any(org in sample_str for org in org_keywords):
+        if any(org in sample_str for org in _ORG_KEYWORDS):
             return "organization_name"
         
         # Testar se são modalidades de licitação
-        modal_keywords = ['PREGAO', 'CONCORRENCIA', 'DISPENSA', 'INEXIGIBILIDADE', 'PE', 'CE']
-        if any(modal in sample_str for modal in modal_keywords):
+        if any(modal in sample_str for modal in _MODAL_KEYWORDS):
             return "bidding_modality"
         
         # Testar se são valores monetários
-        if any(char in sample_str for char in ['R$', 'RS']):
+        if any(char in sample_str for char in _MONEY_MARKERS):
             return "money"
         
         # Testar se contém números com vírgulas (valores)
-        if re.search(r'\d+[,\.]\d+', sample_str):
+        if _RE_NUM_FMT.search(sample_str):
             return "numeric_formatted"
         
         # Testar se são datas
-        if any(char in sample_str for char in ['/', '-']) and re.search(r'\d{1,4}', sample_str):
+        if any(char in sample_str for char in _DATE_SEPARATORS) and _RE_DIGITS.search(sample_str):
             return "date"
         
         return "text"
     
+    @staticmethod
+    @lru_cache(maxsize=NAME_CACHE_SIZE)
+    def _prep_semantic_base(column_name: str) -> Tuple[str, Tuple[str, ...]]:
+        """
+        Base dos aliases semânticos: nome sem acentos/símbolos (símbolos
+        viram espaço) e suas palavras
+        
+        "Data Abertura" → ("data abertura", ("data", "abertura"))
+        """
+        normalized = _RE_NON_ALNUM.sub(' ', unidecode(column_name).lower())
+        return normalized, tuple(_RE_WORD.findall(normalized))
+    
     def _generate_semantic_aliases(
         self,
         column_name: str,
-        column_data: pd.Series,
+        probe: _ColumnProbe,
         content_signature: str
     ) -> List[str]:
         """
@@ -289,44 +779,39 @@ class SchemaDiscoveryService:
         "EDITAL N°" → ["edital", "numero_edital", "edital_numero", 
                        "n_edital", "edital_n", "numero", "id_edital"]
         """
-        aliases: Set[str] = set()
-        
         # 1. Normalizar (remove acentos, símbolos)
-        normalized = unidecode(column_name).lower()
-        normalized = re.sub(r'[^a-z0-9\s]', ' ', normalized)
-        aliases.add(normalized.strip())
+        normalized, words = self._prep_semantic_base(column_name)
         
         # 2. Versões sem espaços
-        aliases.add(normalized.replace(' ', '_'))
-        aliases.add(normalized.replace(' ', ''))
+        aliases: List[str] = [
+            normalized.strip(),
+            normalized.replace(' ', '_'),
+            normalized.replace(' ', ''),
+        ]
         
         # 3. Palavras individuais (> 2 caracteres)
-        words = re.findall(r'\w+', normalized)
-        for word in words:
-            if len(word) > 2:
-                aliases.add(word)
+        aliases.extend(word for word in words if len(word) > 2)
         
         # 4. Combinações de palavras
         if len(words) >= 2:
-            # Primeira + última palavra
-            aliases.add(f"{words[0]}_{words[-1]}")
-            aliases.add(f"{words[0]}{words[-1]}")
-            
-            # Todas as palavras juntas
-            aliases.add("_".join(words))
-            aliases.add("".join(words))
+            # Primeira + última palavra, e todas as palavras juntas
+            aliases.extend((
+                f"{words[0]}_{words[-1]}",
+                f"{words[0]}{words[-1]}",
+                "_".join(words),
+                "".join(words),
+            ))
         
         # 5. CRÍTICO: Aliases baseados no CONTEÚDO
-        content_aliases = self._generate_content_based_aliases(
+        aliases.extend(self._generate_content_based_aliases(
             column_name,
             content_signature
-        )
-        aliases.update(content_aliases)
-        
-        # 6. Remover aliases muito curtos (< 2 chars) ou muito longos (> 50 chars)
-        aliases = {a for a in aliases if 2 <= len(a) <= 50}
+        ))
         
-        return sorted(list(aliases))
+        # 6. Deduplicar uma vez só, sem aliases muito curtos (< 2 chars) ou
+        # muito longos (> 50 chars); internados, pois se repetem entre colunas
+        # e arquivos
+        return sorted({sys.intern(a) for a in aliases if 2 <= len(a) <= 50})
     
     def _generate_content_based_aliases(
         self,
@@ -336,39 +821,13 @@ class SchemaDiscoveryService:
         """
         Gera aliases baseados no tipo de conteúdo
         """
-        aliases = set()
-        
-        if content_signature == "numeric_sequential":
-            aliases.update(["numero", "number", "id", "codigo", "code"])
-        
-        elif content_signature == "organization_name":
-            aliases.update(["orgao", "origem", "secretaria", "entidade", 
-                          "organization", "department", "entity"])
-        
-        elif content_signature == "bidding_modality":
-            aliases.update(["modalidade", "modality", "tipo", "type"])
-        
-        elif content_signature == "money":
-            aliases.update(["valor", "preco", "custo", "montante", 
-                          "value", "price", "cost", "amount"])
-        
-        elif content_signature == "date":
-            aliases.update(["data", "date", "quando", "when", "dia"])
+        aliases = set(_SIGNATURE_ALIASES.get(content_signature, ()))
         
         # Aliases específicos por palavras-chave no nome
         name_lower = column_name.lower()
-        
-        if any(kw in name_lower for kw in ['edital', 'licitacao']):
-            aliases.update(["edital", "licitacao", "bidding", "tender"])
-        
-        if any(kw in name_lower for kw in ['processo', 'proc']):
-            aliases.update(["processo", "process", "proc"])
-        
-        if any(kw in name_lower for kw in ['objeto', 'descricao']):
-            aliases.update(["objeto", "descricao", "description", "object"])
-        
-        if any(kw in name_lower for kw in ['situacao', 'status']):
-            aliases.update(["situacao", "status", "state"])
+        for triggers, keyword_aliases in _KW_GROUPS:
+            if any(kw in name_lower for kw in triggers):
+                aliases.update(keyword_aliases)
         
         return aliases
     
@@ -376,48 +835,123 @@ class SchemaDiscoveryService:
         """
         Cria índice de busca reversa: alias → coluna
         Acelera busca de colunas
+        
+        Todos os aliases são gravados de uma vez (COPY no PostgreSQL, INSERT
+        em lote nos demais), na forma canônica (ver _canonical_alias): variantes
+        como "numero_edital", "numero edital" e "edital_numero" viram uma única
+        linha por coluna, com o match de maior confiança (exato > normalizado >
+        semântico).
+        """
+        rows = self._build_alias_rows(file_schema)
+        self._write_aliases(rows)
+        
+        logger.info(f"   Created alias index for {file_schema.filename} ({len(rows)} aliases)")
+    
+    def _build_alias_rows(self, file_schema: FileSchema) -> List[Dict[str, Any]]:
+        """
+        Linhas de schema_aliases de um schema já com id (após flush)
         """
+        canonical_alias = self._canonical_alias
+        file_schema_id = file_schema.id
+        created_at = datetime.utcnow()
+        rows: List[Dict[str, Any]] = []
+        seen: Set[Tuple[str, str]] = set()
+        
+        def add_alias(alias: str, original_name: str, match_type: str, confidence: float):
+            alias = canonical_alias(alias)
+            key = (alias, original_name)
+            if not alias or key in seen:
+                return
+            seen.add(key)
+            rows.append({
+                "id": generate_uuid(),
+                "file_schema_id": file_schema_id,
+                "alias": alias,
+                "original_column_name": original_name,
+                "match_type": match_type,
+                "confidence": confidence,
+                "created_at": created_at
+            })
+        
         for col_info in file_schema.columns_info:
             original_name = col_info["original_name"]
             
             # 1. Alias exato (nome original)
-            alias_entry = SchemaAlias(
-                file_schema_id=file_schema.id,
-                alias=original_name.lower(),
-                original_column_name=original_name,
-                match_type="exact",
-                confidence="1.0"
-            )
-            self.db.add(alias_entry)
+            add_alias(original_name, original_name, "exact", 1.0)
             
             # 2. Alias normalizado
-            normalized = col_info["normalized_name"]
-            alias_entry = SchemaAlias(
-                file_schema_id=file_schema.id,
-                alias=normalized.lower(),
-                original_column_name=original_name,
-                match_type="normalized",
-                confidence="0.95"
-            )
-            self.db.add(alias_entry)
+            add_alias(col_info["normalized_name"], original_name, "normalized", 0.95)
             
             # 3. Aliases semânticos
             for semantic_alias in col_info["semantic_aliases"]:
-                alias_entry = SchemaAlias(
-                    file_schema_id=file_schema.id,
-                    alias=semantic_alias.lower(),
-                    original_column_name=original_name,
-                    match_type="semantic",
-                    confidence="0.9"
-                )
-                self.db.add(alias_entry)
+                add_alias(semantic_alias, original_name, "semantic", 0.9)
         
-        logger.info(f"   Created alias index for {file_schema.filename}")
+        return rows
+    
+    def _write_aliases(self, rows: List[Dict[str, Any]]):
+        """Grava linhas de aliases: COPY quando possível, senão INSERT em lote"""
+        if not self._copy_aliases(rows):
+            self.db.bulk_insert_mappings(SchemaAlias, rows)
+    
+    @staticmethod
+    @lru_cache(maxsize=NAME_CACHE_SIZE)
+    def _canonical_alias(alias: str) -> str:
+        """
+        Forma canônica de um alias: palavras sem acento, em minúsculas,
+        ordenadas e unidas por "_"
+        
+        "Número Edital" / "edital_numero" → "edital_numero"
+        """
+        return "_".join(sorted(_RE_ALIAS_TOKEN.findall(unidecode(alias).lower())))
+    
+    def _copy_aliases(self, rows: List[Dict[str, Any]]) -> bool:
+        """
+        Grava aliases com COPY ... FROM STDIN (PostgreSQL + psycopg2)
+        
+        Roda dentro de um savepoint: se o COPY falhar, nada fica gravado e o
+        chamador usa o INSERT em lote.
+        
+        Returns:
+            True se os aliases foram gravados via COPY
+        """
+        if not rows or self.db.get_bind().dialect.name != "postgresql":
+            return False
+        
+        try:
+            with self.db.begin_nested():
+                cursor = self.db.connection().connection.cursor()
+                try:
+                    if not hasattr(cursor, "copy_expert"):
+                        return False
+                    buffer = ResourceParser.build_copy_buffer(
+                        [row[column] for column in SCHEMA_ALIAS_COPY_COLUMNS]
+                        for row in rows
+                    )
+                    cursor.copy_expert(_SCHEMA_ALIAS_COPY_SQL, buffer)
+                finally:
+                    cursor.close()
+            return True
+        except Exception as e:
+            logger.warning(f"COPY of schema aliases failed, using bulk insert: {e}")
+            return False
     
     def get_schema_by_raw_file(self, raw_file_id: str) -> Optional[FileSchema]:
-        """Busca schema por raw_file_id"""
+        """
+        Busca schema por raw_file_id
+        
+        Segue raw_files.file_schema_id, que também cobre arquivos que
+        reutilizaram o schema de outro com o mesmo cabeçalho; schemas
+        gravados antes dessa associação são encontrados por raw_file_id.
+        """
+        linked_schema_id = select(RawFile.file_schema_id).where(
+            RawFile.id == raw_file_id
+        ).scalar_subquery()
+        
         return self.db.query(FileSchema).filter(
-            FileSchema.raw_file_id == raw_file_id,
+            or_(
+                FileSchema.id == linked_schema_id,
+                FileSchema.raw_file_id == raw_file_id
+            ),
             FileSchema.status == "active"
         ).first()
     
@@ -444,32 +978,36 @@ class SchemaDiscoveryService:
         """
         alias_lower = alias.lower().strip()
         
-        query = self.db.query(SchemaAlias).filter(
-            SchemaAlias.alias == alias_lower
+        # Forma canônica (índice atual) e forma literal (aliases gravados antes
+        # da canonicalização)
+        alias_keys = {alias_lower, self._canonical_alias(alias_lower)}
+        
+        # Alias e schema em uma única query (JOIN), já ordenada por confiança
+        query = self.db.query(
+            SchemaAlias.original_column_name,
+            SchemaAlias.match_type,
+            SchemaAlias.confidence,
+            FileSchema.id,
+            FileSchema.filename
+        ).join(
+            FileSchema, FileSchema.id == SchemaAlias.file_schema_id
+        ).filter(
+            SchemaAlias.alias.in_(alias_keys)
         )
         
         if file_schema_id:
             query = query.filter(SchemaAlias.file_schema_id == file_schema_id)
         
-        results = query.all()
-        
-        matches = []
-        for result in results:
-            schema = self.db.query(FileSchema).filter(
-                FileSchema.id == result.file_schema_id
-            ).first()
-            
-            if schema:
-                matches.append({
-                    "file_schema_id": schema.id,
-                    "filename": schema.filename,
-                    "original_column_name": result.original_column_name,
-                    "match_type": result.match_type,
-                    "confidence": float(result.confidence)
-                })
-        
-        # Ordenar por confiança
-        matches.sort(key=lambda x: x["confidence"], reverse=True)
-        
-        return matches
+        query = query.order_by(SchemaAlias.confidence.desc())
+        
+        return [
+            {
+                "file_schema_id": schema_id,
+                "filename": filename,
+                "original_column_name": original_column_name,
+                "match_type": match_type,
+                "confidence": confidence
+            }
+            for original_column_name, match_type, confidence, schema_id, filename in query.all()
+        ]
 
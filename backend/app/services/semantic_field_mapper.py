@@ -3,42 +3,81 @@ Serviço para mapeamento semântico de campos
 FASE 2: Mapeia intenção do usuário para campos reais
 """
 
+import heapq
 import logging
+import os
 import re
-from typing import List, Dict, Any, Optional
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from operator import attrgetter
+from dataclasses import dataclass
+from datetime import datetime
+from typing import List, Dict, Any, FrozenSet, Iterable, Optional, Tuple
 from sqlalchemy.orm import Session
-from difflib import SequenceMatcher
+from rapidfuzz import fuzz, process
 
 from app.models.file_schema import FileSchema, SchemaAlias
 from app.services.schema_discovery_service import SchemaDiscoveryService
 
 logger = logging.getLogger(__name__)
 
+# Números inteiros na query (possíveis valores de campos)
+_NUMBER_RE = re.compile(r'\b\d+\b')
 
+# Entre entidades sobrepostas na query, fica a de maior prioridade
+_ENTITY_PRIORITY = {"number": 0, "organization": 1, "field_name": 2}
+
+# Pool compartilhado para mapear entidades em vários schemas em paralelo
+_MAPPING_EXEC = ThreadPoolExecutor(
+    max_workers=min(8, os.cpu_count() or 1), thread_name_prefix="field-map"
+)
+
+
+def _build_trie_pattern(words: Iterable[str]) -> Optional[re.Pattern]:
+    """
+    Compila palavras em uma única regex em forma de trie (prefixos comuns
+    fatorados), que encontra em uma passada todas as posições da query onde
+    alguma palavra começa, preferindo a mais longa
+    
+    ["edital", "edital_n", "num"] → (?=((?:edital(?:_n)?|num)))
+    """
+    trie: Dict[str, dict] = {}
+    for word in words:
+        node = trie
+        for char in word:
+            node = node.setdefault(char, {})
+        node[""] = {}
+    
+    def render(node: Dict[str, dict]) -> str:
+        branches = [re.escape(char) + render(child) for char, child in sorted(node.items()) if char]
+        if not branches:
+            return ""
+        body = branches[0] if len(branches) == 1 else "(?:" + "|".join(branches) + ")"
+        if "" in node:
+            body = f"(?:{body})?"
+        return body
+    
+    pattern = render(trie)
+    if not pattern:
+        return None
+    # Lookahead: matches sobrepostos (uma palavra por posição inicial)
+    return re.compile(f"(?=({pattern}))", re.IGNORECASE)
+
+
+@dataclass(slots=True, frozen=True)
 class FieldMapping:
-    """Representa um mapeamento de query → campo"""
+    """Representa um mapeamento de query → campo (imutável: pode ficar em cache)"""
     
-    def __init__(
-        self,
-        query_text: str,
-        file_schema_id: str,
-        filename: str,
-        column_name: str,
-        column_type: str,
-        match_type: str,
-        confidence: float,
-        value: Any = None,
-        operator: str = None
-    ):
-        self.query_text = query_text
-        self.file_schema_id = file_schema_id
-        self.filename = filename
-        self.column_name = column_name
-        self.column_type = column_type
-        self.match_type = match_type
-        self.confidence = confidence
-        self.value = value
-        self.operator = operator
+    query_text: str
+    file_schema_id: str
+    filename: str
+    column_name: str
+    column_type: str
+    match_type: str
+    confidence: float
+    value: Any = None
+    operator: Optional[str] = None
     
     def to_dict(self) -> Dict[str, Any]:
         return {
@@ -54,6 +93,94 @@ class FieldMapping:
         }
 
 
+@dataclass
+class _SchemaIndex:
+    """
+    Estruturas de busca de um schema, montadas uma vez a partir de
+    columns_info (que não muda depois da descoberta)
+    """
+    # Alias/nome normalizado/nome original (minúsculas) → primeira coluna que o tem
+    by_alias: Dict[str, Dict[str, Any]]
+    # content_signature → valor em maiúsculas → colunas (em ordem) que o contêm
+    # em unique_values
+    columns_by_value: Dict[str, Dict[str, List[Dict[str, Any]]]]
+    # Colunas numéricas: (nome original, tipo, confiança do match numérico)
+    numeric_cols: List[Tuple[str, str, float]]
+    # Candidatos da busca fuzzy: texto em minúsculas e (coluna, match_type, peso)
+    fuzzy_choices: List[str]
+    fuzzy_targets: List[Tuple[Dict[str, Any], str, float]]
+    # Palavras-chave de campos (nome normalizado + 5 primeiros aliases, >= 3 chars)
+    field_keywords: FrozenSet[str]
+    # unique_values por content_signature
+    values_by_signature: Dict[str, FrozenSet[Any]]
+    
+    @classmethod
+    def build(cls, schema: FileSchema) -> "_SchemaIndex":
+        by_alias: Dict[str, Dict[str, Any]] = {}
+        columns_by_value: Dict[str, Dict[str, List[Dict[str, Any]]]] = {}
+        numeric_cols = []
+        fuzzy_choices: List[str] = []
+        fuzzy_targets: List[Tuple[Dict[str, Any], str, float]] = []
+        field_keywords = set()
+        values_by_signature: Dict[str, set] = {}
+        
+        for col in schema.columns_info:
+            aliases = [alias.lower() for alias in col.get("semantic_aliases", [])]
+            normalized_name = col.get("normalized_name", "").lower()
+            
+            # Mesma precedência de FileSchema.get_column_by_alias
+            for key in (*aliases, normalized_name, col.get("original_name", "").lower()):
+                by_alias.setdefault(key, col)
+            
+            unique_values = col.get("unique_values") or []
+            signature_values = columns_by_value.setdefault(col.get("content_signature"), {})
+            for upper_value in {v.upper() for v in unique_values if isinstance(v, str)}:
+                signature_values.setdefault(upper_value, []).append(col)
+            
+            if col["data_type"] in ["integer", "float"]:
+                # Se é uma coluna sequencial (edital, processo), alta confiança
+                confidence = 0.9 if col["content_signature"] == "numeric_sequential" else 0.7
+                numeric_cols.append((col["original_name"], col["data_type"], confidence))
+            
+            fuzzy_choices.append(normalized_name)
+            fuzzy_targets.append((col, "fuzzy", 0.8))  # Penalizar fuzzy match
+            for alias in aliases:
+                fuzzy_choices.append(alias)
+                fuzzy_targets.append((col, "fuzzy_alias", 0.85))
+            
+            field_keywords.add(col["normalized_name"])
+            field_keywords.update(col.get("semantic_aliases", [])[:5])
+            
+            if unique_values:
+                values_by_signature.setdefault(col.get("content_signature"), set()).update(unique_values)
+        
+        return cls(
+            by_alias,
+            columns_by_value,
+            numeric_cols,
+            fuzzy_choices,
+            fuzzy_targets,
+            frozenset(kw for kw in field_keywords if len(kw) >= 3),
+            {signature: frozenset(values) for signature, values in values_by_signature.items()}
+        )
+
+
+def _format_mapping(index: int, mapping: FieldMapping) -> str:
+    """Bloco de um mapeamento no texto para o LLM (com linha em branco no fim)"""
+    value_line = (
+        f"   → Valor: {mapping.value} ({mapping.operator})\n"
+        if mapping.value is not None else ""
+    )
+    return (
+        f"{index}. Query: \"{mapping.query_text}\"\n"
+        f"   → Arquivo: {mapping.filename}\n"
+        f"   → Coluna: \"{mapping.column_name}\"\n"
+        f"   → Tipo: {mapping.column_type}\n"
+        f"   → Match: {mapping.match_type} (confiança: {mapping.confidence:.2f})\n"
+        f"{value_line}"
+    )
+
+
 class SemanticFieldMapper:
     """
     Mapeia queries do usuário para campos reais do schema
@@ -63,6 +190,28 @@ class SemanticFieldMapper:
     - Mapper: {field: "EDITAL N°", value: 10367}
     """
     
+    # Padrões de entidades por conjunto de schemas ((id, discovered_at) de cada um)
+    ENTITY_PATTERN_CACHE_SIZE = 16
+    _entity_pattern_cache: "OrderedDict[Tuple[Tuple[str, datetime], ...], tuple]" = OrderedDict()
+    
+    # Índices de busca por schema ((id, discovered_at)). A capacidade cresce
+    # até o maior conjunto de schemas mapeado de uma vez, para que o
+    # pré-carregamento do caminho paralelo não descarte as próprias entradas
+    SCHEMA_INDEX_CACHE_SIZE = 256
+    _schema_index_cache: "OrderedDict[Tuple[str, datetime], _SchemaIndex]" = OrderedDict()
+    _schema_index_capacity = SCHEMA_INDEX_CACHE_SIZE
+    
+    # A partir de quantos schemas o mapeamento é distribuído no pool de threads
+    MIN_SCHEMAS_FOR_PARALLEL = 4
+    
+    # Mapeamentos por (query, conjunto de schemas): perguntas se repetem
+    MAPPING_CACHE_SIZE = 1024
+    _mapping_cache: "OrderedDict[Tuple[str, Tuple[Tuple[str, datetime], ...], Optional[int]], List[FieldMapping]]" = OrderedDict()
+    
+    # Os caches acima são compartilhados entre threads (asyncio.to_thread e
+    # _MAPPING_EXEC); toda leitura/escrita passa por este lock
+    _cache_lock = threading.Lock()
+    
     def __init__(self, db: Session):
         self.db = db
         self.schema_service = SchemaDiscoveryService(db)
@@ -70,14 +219,20 @@ class SemanticFieldMapper:
     def map_user_query_to_fields(
         self,
         user_query: str,
-        file_schemas: Optional[List[FileSchema]] = None
+        file_schemas: Optional[List[FileSchema]] = None,
+        top_n: Optional[int] = None
     ) -> List[FieldMapping]:
         """
         Mapeia query do usuário para campos do schema
         
+        O resultado é memorizado por (query, (id, discovered_at) dos schemas):
+        a mesma pergunta sobre os mesmos schemas não refaz a extração.
+        
         Args:
             user_query: Query do usuário ("edital 10367 da SEINF")
             file_schemas: Schemas específicos (se None, usa todos)
+            top_n: Se informado, só os top_n de maior confiança (seleção
+                parcial, sem ordenar todos os mapeamentos)
         
         Returns:
             Lista de mapeamentos
@@ -89,6 +244,20 @@ class SemanticFieldMapper:
             logger.warning("No active schemas found")
             return []
         
+        cache_key = (
+            user_query,
+            tuple((schema.id, schema.discovered_at) for schema in file_schemas),
+            top_n
+        )
+        cache = self._mapping_cache
+        with self._cache_lock:
+            cached = cache.get(cache_key)
+            if cached is not None:
+                cache.move_to_end(cache_key)
+        if cached is not None:
+            logger.info(f"✅ Mapeamentos em cache para: '{user_query}' ({len(cached)})")
+            return list(cached)
+        
         logger.info(f"🔍 Mapping query: '{user_query}'")
         logger.info(f"   Schemas disponíveis: {len(file_schemas)}")
         
@@ -102,20 +271,48 @@ class SemanticFieldMapper:
         # 2. Para cada entidade, encontrar campo correspondente
         mappings = []
         
-        for entity in entities:
-            entity_mappings = self._map_entity_to_fields(
-                entity,
-                file_schemas,
-                user_query
-            )
-            mappings.extend(entity_mappings)
+        if len(file_schemas) >= self.MIN_SCHEMAS_FOR_PARALLEL and entities:
+            # Schemas são independentes: um job por schema. Índices montados
+            # antes, nesta thread, para os jobs só lerem o cache.
+            self._reserve_schema_index_capacity(len(file_schemas))
+            for schema in file_schemas:
+                self._get_schema_index(schema)
+            per_schema = list(_MAPPING_EXEC.map(
+                lambda schema: [
+                    self._map_entity_to_fields(entity, [schema], user_query)
+                    for entity in entities
+                ],
+                file_schemas
+            ))
+            # Mesma ordem do caminho sequencial: entidade, depois schema
+            for entity_index in range(len(entities)):
+                for schema_mappings in per_schema:
+                    mappings.extend(schema_mappings[entity_index])
+        else:
+            for entity in entities:
+                entity_mappings = self._map_entity_to_fields(
+                    entity,
+                    file_schemas,
+                    user_query
+                )
+                mappings.extend(entity_mappings)
         
-        # 3. Ranquear por confiança
-        mappings.sort(key=lambda x: x.confidence, reverse=True)
+        # 3. Ranquear por confiança (estável: empates mantêm a ordem de extração)
+        by_confidence = attrgetter("confidence")
+        if top_n is None:
+            mappings.sort(key=by_confidence, reverse=True)
+        else:
+            mappings = heapq.nlargest(top_n, mappings, key=by_confidence)
         
         logger.info(f"✅ Encontrados {len(mappings)} mapeamentos")
         
-        return mappings
+        with self._cache_lock:
+            cache[cache_key] = mappings
+            cache.move_to_end(cache_key)
+            if len(cache) > self.MAPPING_CACHE_SIZE:
+                cache.popitem(last=False)
+        
+        return list(mappings)
     
     def _extract_entities(
         self,
@@ -125,64 +322,176 @@ class SemanticFieldMapper:
         """
         Extrai entidades da query
         
+        Entidades com trechos sobrepostos são reduzidas a uma só, preferindo
+        nome de campo > organização > número.
+        
         "edital 10367 da SEINF" → [
             {"text": "edital", "type": "field_name", "position": 0},
             {"text": "10367", "type": "number", "position": 7},
             {"text": "SEINF", "type": "organization", "position": 16}
         ]
         """
-        entities = []
+        numbers = []
+        organizations = []
+        field_names = []
         
         # 1. Números (possíveis valores de campos)
-        for match in re.finditer(r'\b\d+\b', query):
-            entities.append({
+        for match in _NUMBER_RE.finditer(query):
+            numbers.append({
                 "text": match.group(),
                 "type": "number",
                 "position": match.start(),
                 "value": int(match.group())
             })
         
-        # 2. Organizações conhecidas (extrair de schemas)
-        org_values = self._extract_known_values_from_schemas(
-            file_schemas,
-            ["organization_name", "category"]
+        org_pattern, orgs_by_upper, keyword_pattern, keywords_by_lower = (
+            self._get_entity_patterns(file_schemas)
         )
         
-        for org in org_values:
-            if org.upper() in query.upper():
-                pos = query.upper().index(org.upper())
-                entities.append({
-                    "text": org,
-                    "type": "organization",
-                    "position": pos,
-                    "value": org
-                })
+        # 2. Organizações conhecidas (extrair de schemas): primeira ocorrência de cada
+        if org_pattern is not None:
+            seen_orgs = set()
+            for match in org_pattern.finditer(query):
+                org = orgs_by_upper.get(match.group(1).upper())
+                if org is not None and org not in seen_orgs:
+                    seen_orgs.add(org)
+                    organizations.append({
+                        "text": org,
+                        "type": "organization",
+                        "position": match.start(),
+                        "value": org
+                    })
         
         # 3. Palavras-chave de campos (baseado em aliases dos schemas)
-        field_keywords = self._extract_field_keywords_from_schemas(file_schemas)
-        
-        for keyword in field_keywords:
-            if keyword.lower() in query.lower():
-                pos = query.lower().index(keyword.lower())
-                entities.append({
-                    "text": keyword,
-                    "type": "field_name",
-                    "position": pos
-                })
-        
-        # 4. Remover duplicatas (mesma posição)
-        seen_positions = set()
+        if keyword_pattern is not None:
+            seen_keywords = set()
+            for match in keyword_pattern.finditer(query):
+                keyword = keywords_by_lower.get(match.group(1).lower())
+                if keyword is not None and keyword not in seen_keywords:
+                    seen_keywords.add(keyword)
+                    field_names.append({
+                        "text": keyword,
+                        "type": "field_name",
+                        "position": match.start()
+                    })
+        
+        # 4. Remover sobreposições: as três listas já estão em ordem de posição,
+        #    então basta intercalá-las e varrer uma vez
         unique_entities = []
+        last_end = -1
         
-        for entity in sorted(entities, key=lambda x: x["position"]):
-            if entity["position"] not in seen_positions:
+        for entity in heapq.merge(numbers, organizations, field_names, key=lambda x: x["position"]):
+            end = entity["position"] + len(entity["text"])
+            if entity["position"] >= last_end:
                 unique_entities.append(entity)
-                seen_positions.add(entity["position"])
+                last_end = end
+            elif _ENTITY_PRIORITY[entity["type"]] > _ENTITY_PRIORITY[unique_entities[-1]["type"]]:
+                unique_entities[-1] = entity
+                last_end = end
         
         return unique_entities
     
+    @classmethod
+    def _get_entity_patterns(cls, file_schemas: List[FileSchema]) -> tuple:
+        """
+        Regex (trie) de organizações e de palavras-chave de campos do conjunto
+        de schemas, memorizadas
+        
+        Schemas não mudam depois de descobertos (uma nova descoberta gera um
+        novo registro), então os pares (id, discovered_at) identificam os padrões.
+        
+        Returns:
+            (regex de organizações, organização por texto em maiúsculas,
+             regex de palavras-chave, palavra-chave por texto em minúsculas)
+        """
+        key = tuple((schema.id, schema.discovered_at) for schema in file_schemas)
+        cache = cls._entity_pattern_cache
+        
+        with cls._cache_lock:
+            patterns = cache.get(key)
+            if patterns is not None:
+                cache.move_to_end(key)
+                return patterns
+        
+        orgs = cls._extract_known_values_from_schemas(
+            file_schemas,
+            ["organization_name", "category"]
+        )
+        orgs_by_upper = {str(org).upper(): org for org in orgs if org}
+        
+        keywords = cls._extract_field_keywords_from_schemas(file_schemas)
+        keywords_by_lower = {keyword.lower(): keyword for keyword in keywords}
+        
+        patterns = (
+            _build_trie_pattern(org.lower() for org in orgs_by_upper),
+            orgs_by_upper,
+            _build_trie_pattern(keywords_by_lower),
+            keywords_by_lower
+        )
+        with cls._cache_lock:
+            cache[key] = patterns
+            cache.move_to_end(key)
+            if len(cache) > cls.ENTITY_PATTERN_CACHE_SIZE:
+                cache.popitem(last=False)
+        
+        return patterns
+    
+    @classmethod
+    def invalidate_cache(cls, schema_id: Optional[str] = None):
+        """
+        Descarta padrões, índices e mapeamentos memorizados do schema (ou de
+        todos, se schema_id for None)
+        
+        As chaves (id, discovered_at) já mudam a cada nova descoberta; isto só
+        é necessário se o columns_info de um schema existente for alterado.
+        """
+        with cls._cache_lock:
+            if schema_id is None:
+                cls._entity_pattern_cache.clear()
+                cls._schema_index_cache.clear()
+                cls._mapping_cache.clear()
+                return
+            
+            for key in [k for k in cls._schema_index_cache if k[0] == schema_id]:
+                del cls._schema_index_cache[key]
+            for key in [k for k in cls._entity_pattern_cache if any(sid == schema_id for sid, _ in k)]:
+                del cls._entity_pattern_cache[key]
+            for key in [k for k in cls._mapping_cache if any(sid == schema_id for sid, _ in k[1])]:
+                del cls._mapping_cache[key]
+    
+    @classmethod
+    def _reserve_schema_index_capacity(cls, schema_count: int):
+        """Garante que o cache de índices comporte schema_count schemas"""
+        with cls._cache_lock:
+            if schema_count > cls._schema_index_capacity:
+                cls._schema_index_capacity = schema_count
+    
+    @classmethod
+    def _get_schema_index(cls, schema: FileSchema) -> _SchemaIndex:
+        """Índice de busca do schema, memorizado por (id, discovered_at)"""
+        key = (schema.id, schema.discovered_at)
+        cache = cls._schema_index_cache
+        
+        with cls._cache_lock:
+            index = cache.get(key)
+            if index is not None:
+                cache.move_to_end(key)
+                return index
+        
+        # Montagem fora do lock; se outra thread montar o mesmo índice, a
+        # primeira gravação prevalece
+        index = _SchemaIndex.build(schema)
+        with cls._cache_lock:
+            index = cache.setdefault(key, index)
+            cache.move_to_end(key)
+            while len(cache) > cls._schema_index_capacity:
+                cache.popitem(last=False)
+        
+        return index
+    
+    @classmethod
     def _extract_known_values_from_schemas(
-        self,
+        cls,
         file_schemas: List[FileSchema],
         content_signatures: List[str]
     ) -> List[str]:
@@ -193,36 +502,24 @@ class SemanticFieldMapper:
         known_values = set()
         
         for schema in file_schemas:
-            for col_info in schema.columns_info:
-                if col_info.get("content_signature") in content_signatures:
-                    unique_values = col_info.get("unique_values", [])
-                    if unique_values:
-                        known_values.update(unique_values)
+            values_by_signature = cls._get_schema_index(schema).values_by_signature
+            for signature in content_signatures:
+                known_values.update(values_by_signature.get(signature, ()))
         
         return list(known_values)
     
+    @classmethod
     def _extract_field_keywords_from_schemas(
-        self,
+        cls,
         file_schemas: List[FileSchema]
     ) -> List[str]:
         """
-        Extrai palavras-chave de campos dos schemas
+        Extrai palavras-chave de campos dos schemas (já filtradas no índice
+        de cada schema)
         """
-        keywords = set()
-        
-        for schema in file_schemas:
-            for col_info in schema.columns_info:
-                # Nome normalizado
-                keywords.add(col_info["normalized_name"])
-                
-                # Aliases semânticos (top 5)
-                aliases = col_info.get("semantic_aliases", [])
-                keywords.update(aliases[:5])
-        
-        # Filtrar keywords muito curtos
-        keywords = {kw for kw in keywords if len(kw) >= 3}
-        
-        return list(keywords)
+        return list(frozenset().union(
+            *(cls._get_schema_index(schema).field_keywords for schema in file_schemas)
+        ))
     
     def _map_entity_to_fields(
         self,
@@ -275,9 +572,11 @@ class SemanticFieldMapper:
         """
         mappings = []
         
+        alias_key = field_text.lower().strip()
+        
         for schema in file_schemas:
-            # Buscar por alias
-            col_info = schema.get_column_by_alias(field_text)
+            # Buscar por alias (índice do schema: O(1))
+            col_info = self._get_schema_index(schema).by_alias.get(alias_key)
             
             if col_info:
                 mapping = FieldMapping(
@@ -309,36 +608,24 @@ class SemanticFieldMapper:
         """
         Mapeia valor numérico para colunas numéricas
         """
-        mappings = []
-        
-        for schema in file_schemas:
-            # Buscar colunas numéricas
-            numeric_columns = [
-                col for col in schema.columns_info
-                if col["data_type"] in ["integer", "float"]
-            ]
-            
-            for col in numeric_columns:
-                # Se é uma coluna sequencial (edital, processo), alta confiança
-                if col["content_signature"] == "numeric_sequential":
-                    confidence = 0.9
-                else:
-                    confidence = 0.7
-                
-                mapping = FieldMapping(
-                    query_text=str(number_value),
-                    file_schema_id=schema.id,
-                    filename=schema.filename,
-                    column_name=col["original_name"],
-                    column_type=col["data_type"],
-                    match_type="inferred_numeric",
-                    confidence=confidence,
-                    value=number_value,
-                    operator="equals"
-                )
-                mappings.append(mapping)
-        
-        return mappings
+        query_text = str(number_value)
+        
+        # Colunas numéricas e confianças pré-calculadas no índice do schema
+        return [
+            FieldMapping(
+                query_text=query_text,
+                file_schema_id=schema.id,
+                filename=schema.filename,
+                column_name=column_name,
+                column_type=column_type,
+                match_type="inferred_numeric",
+                confidence=confidence,
+                value=number_value,
+                operator="equals"
+            )
+            for schema in file_schemas
+            for column_name, column_type, confidence in self._get_schema_index(schema).numeric_cols
+        ]
     
     def _map_categorical_value(
         self,
@@ -350,26 +637,24 @@ class SemanticFieldMapper:
         Mapeia valor categórico para colunas
         """
         mappings = []
+        value_upper = value.upper()
         
         for schema in file_schemas:
-            for col in schema.columns_info:
-                if col.get("content_signature") == content_signature:
-                    # Verificar se valor existe nos unique_values
-                    unique_values = col.get("unique_values", [])
-                    
-                    if value.upper() in [v.upper() for v in unique_values]:
-                        mapping = FieldMapping(
-                            query_text=value,
-                            file_schema_id=schema.id,
-                            filename=schema.filename,
-                            column_name=col["original_name"],
-                            column_type=col["data_type"],
-                            match_type="exact_value",
-                            confidence=1.0,
-                            value=value,
-                            operator="equals"
-                        )
-                        mappings.append(mapping)
+            # Colunas cujos unique_values contêm o valor: uma consulta ao índice
+            columns_by_value = self._get_schema_index(schema).columns_by_value
+            for col in columns_by_value.get(content_signature, {}).get(value_upper, []):
+                mapping = FieldMapping(
+                    query_text=value,
+                    file_schema_id=schema.id,
+                    filename=schema.filename,
+                    column_name=col["original_name"],
+                    column_type=col["data_type"],
+                    match_type="exact_value",
+                    confidence=1.0,
+                    value=value,
+                    operator="equals"
+                )
+                mappings.append(mapping)
         
         return mappings
     
@@ -381,48 +666,34 @@ class SemanticFieldMapper:
     ) -> List[FieldMapping]:
         """
         Busca fuzzy para typos e variações
+        
+        Nomes normalizados e aliases de todas as colunas são pontuados de uma
+        vez pelo RapidFuzz (similaridade Indel, 0-100), descartando em C o que
+        fica abaixo do threshold.
         """
-        mappings = []
+        # Candidatos na ordem: nome normalizado da coluna, depois seus aliases
+        index = self._get_schema_index(schema)
+        
+        matches = process.extract(
+            search_text.lower(),
+            index.fuzzy_choices,
+            scorer=fuzz.ratio,
+            score_cutoff=threshold * 100,
+            limit=None
+        )
         
-        for col in schema.columns_info:
-            # Testar similaridade com nome normalizado
-            similarity = SequenceMatcher(
-                None,
-                search_text.lower(),
-                col["normalized_name"].lower()
-            ).ratio()
-            
-            if similarity >= threshold:
-                mapping = FieldMapping(
-                    query_text=search_text,
-                    file_schema_id=schema.id,
-                    filename=schema.filename,
-                    column_name=col["original_name"],
-                    column_type=col["data_type"],
-                    match_type="fuzzy",
-                    confidence=similarity * 0.8  # Penalizar fuzzy match
-                )
-                mappings.append(mapping)
-            
-            # Testar similaridade com aliases
-            for alias in col.get("semantic_aliases", []):
-                similarity = SequenceMatcher(
-                    None,
-                    search_text.lower(),
-                    alias.lower()
-                ).ratio()
-                
-                if similarity >= threshold:
-                    mapping = FieldMapping(
-                        query_text=search_text,
-                        file_schema_id=schema.id,
-                        filename=schema.filename,
-                        column_name=col["original_name"],
-                        column_type=col["data_type"],
-                        match_type="fuzzy_alias",
-                        confidence=similarity * 0.85
-                    )
-                    mappings.append(mapping)
+        mappings = []
+        for _, score, position in sorted(matches, key=lambda match: match[2]):
+            col, match_type, weight = index.fuzzy_targets[position]
+            mappings.append(FieldMapping(
+                query_text=search_text,
+                file_schema_id=schema.id,
+                filename=schema.filename,
+                column_name=col["original_name"],
+                column_type=col["data_type"],
+                match_type=match_type,
+                confidence=score / 100 * weight
+            ))
         
         return mappings
     
@@ -437,23 +708,13 @@ class SemanticFieldMapper:
         if not mappings:
             return "Nenhum mapeamento encontrado."
         
-        lines = [
+        # Cada bloco termina com linha em branco (separador entre mapeamentos)
+        return "\n".join((
             "━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━",
             f"MAPEAMENTOS ENCONTRADOS ({len(mappings)} total, mostrando top {top_n}):",
-            ""
-        ]
-        
-        for i, mapping in enumerate(mappings[:top_n], 1):
-            lines.append(f"{i}. Query: \"{mapping.query_text}\"")
-            lines.append(f"   → Arquivo: {mapping.filename}")
-            lines.append(f"   → Coluna: \"{mapping.column_name}\"")
-            lines.append(f"   → Tipo: {mapping.column_type}")
-            lines.append(f"   → Match: {mapping.match_type} (confiança: {mapping.confidence:.2f})")
-            
-            if mapping.value is not None:
-                lines.append(f"   → Valor: {mapping.value} ({mapping.operator})")
-            
-            lines.append("")
-        
-        return "\n".join(lines)
-
+            "",
+            *(
+                _format_mapping(i, mapping)
+                for i, mapping in enumerate(mappings[:top_n], 1)
+            )
+        ))
@@ -2,8 +2,11 @@
 Text Chunker - Divide texto em chunks semânticos para vetorização
 """
 
+import re
+from collections import deque
+from functools import lru_cache
 from langchain.text_splitter import RecursiveCharacterTextSplitter
-from typing import List, Dict
+from typing import List, Dict, Tuple
 import structlog
 
 from app.core.config import settings
@@ -11,11 +14,24 @@ from app.core.config import settings
 logger = structlog.get_logger()
 
 
+@lru_cache(maxsize=32)
+def _section_start_pattern(section_markers: Tuple[str, ...]) -> re.Pattern:
+    """
+    Regex que casa o início das linhas que começam (após espaços) com algum
+    marcador de seção, sem diferenciar maiúsculas/minúsculas
+    """
+    alternation = "|".join(re.escape(marker) for marker in section_markers)
+    return re.compile(rf"^[^\S\n]*(?:{alternation})", re.IGNORECASE | re.MULTILINE)
+
+
 class TextChunker:
     """
     Divide texto em chunks inteligentes mantendo contexto semântico
     """
     
+    # Estimativa de tokens do modelo de embedding (~4 caracteres por token)
+    CHARS_PER_TOKEN = 4
+    
     def __init__(
         self,
         chunk_size: int = None,
@@ -68,34 +84,93 @@ class TextChunker:
             self.logger.warning("Empty text provided for chunking")
             return []
         
-        # Dividir texto
-        text_chunks = self.splitter.split_text(text)
+        # Dividir texto (parágrafos; o splitter recursivo só para os muito longos)
+        text_chunks = self._fast_split(text)
         
-        # Criar chunks com metadados
-        chunks = []
-        for i, chunk_text in enumerate(text_chunks):
-            chunk = {
+        # Criar chunks com metadados (a parte comum a todos é montada uma vez)
+        total_chunks = len(text_chunks)
+        base_metadata = {"document_type": document_type, **(metadata or {})}
+        chunks = [
+            {
                 "id": i,
                 "text": chunk_text,
                 "char_count": len(chunk_text),
                 "word_count": len(chunk_text.split()),
                 "metadata": {
                     "chunk_index": i,
-                    "total_chunks": len(text_chunks),
-                    "document_type": document_type,
-                    **(metadata or {})
+                    "total_chunks": total_chunks,
+                    **base_metadata
                 }
             }
-            chunks.append(chunk)
+            for i, chunk_text in enumerate(text_chunks)
+        ]
         
         self.logger.info(
             "Text chunking completed",
             total_chunks=len(chunks),
-            avg_chunk_size=sum(c["char_count"] for c in chunks) / len(chunks) if chunks else 0
+            avg_chunk_size=sum(map(len, text_chunks)) / total_chunks if chunks else 0
         )
         
         return chunks
     
+    def _fast_split(self, text: str) -> List[str]:
+        """
+        Divide o texto em parágrafos ("\n\n", localizados com str.find) e os
+        agrupa gulosamente em chunks de até chunk_size caracteres
+        
+        Como no RecursiveCharacterTextSplitter, a sobreposição é feita com os
+        parágrafos finais do chunk anterior (até chunk_overlap caracteres).
+        Só parágrafos maiores que chunk_size passam pelo splitter do LangChain.
+        """
+        separator = "\n\n"
+        separator_len = len(separator)
+        chunks: List[str] = []
+        window: deque = deque()  # Parágrafos do chunk em montagem
+        window_len = 0           # Tamanho do chunk em montagem (com separadores)
+        
+        def emit():
+            chunk = separator.join(window).strip()
+            if chunk:
+                chunks.append(chunk)
+        
+        start = 0
+        while start <= len(text):
+            end = text.find(separator, start)
+            if end == -1:
+                end = len(text)
+            paragraph = text[start:end]
+            start = end + separator_len
+            
+            if not paragraph.strip():
+                continue
+            
+            if len(paragraph) > self.chunk_size:
+                # Parágrafo longo demais: fecha o chunk atual e usa o splitter recursivo
+                if window:
+                    emit()
+                    window.clear()
+                    window_len = 0
+                chunks.extend(self.splitter.split_text(paragraph))
+                continue
+            
+            if window and window_len + separator_len + len(paragraph) > self.chunk_size:
+                emit()
+                # Manter os parágrafos finais como sobreposição
+                while window and (
+                    window_len > self.chunk_overlap
+                    or window_len + separator_len + len(paragraph) > self.chunk_size
+                ):
+                    removed = window.popleft()
+                    window_len -= len(removed) + (separator_len if window else 0)
+            
+            window_len += len(paragraph) + (separator_len if window else 0)
+            window.append(paragraph)
+        
+        if window:
+            emit()
+        
+        return chunks
+    
     def chunk_by_sections(
         self,
         text: str,
@@ -124,45 +199,33 @@ class TextChunker:
         
         self.logger.info("Chunking by sections", markers=section_markers)
         
-        # Implementação simples: dividir por marcadores
-        # TODO: Implementar parser mais sofisticado se necessário
+        # Inícios de seção localizados em uma única passada pelo texto; cada
+        # seção vai do início da sua linha até antes da próxima seção
+        starts = [
+            match.start()
+            for match in _section_start_pattern(tuple(section_markers)).finditer(text)
+            if match.start() > 0
+        ]
         
         chunks = []
-        current_section = []
+        section_start = 0
         current_marker = None
         
-        for line in text.split('\n'):
-            # Verificar se linha começa com marcador de seção
-            is_section_start = any(
-                line.strip().upper().startswith(marker.upper())
-                for marker in section_markers
-            )
-            
-            if is_section_start and current_section:
-                # Salvar seção anterior
-                section_text = '\n'.join(current_section)
-                if section_text.strip():
-                    chunks.append({
-                        "text": section_text,
-                        "section_marker": current_marker,
-                        "char_count": len(section_text)
-                    })
-                
-                # Iniciar nova seção
-                current_section = [line]
-                current_marker = line.strip().split()[0] if line.strip() else None
-            else:
-                current_section.append(line)
-        
-        # Adicionar última seção
-        if current_section:
-            section_text = '\n'.join(current_section)
+        for next_start in starts + [len(text) + 1]:
+            # Seção anterior (sem a quebra de linha que precede a próxima)
+            section_text = text[section_start:next_start - 1]
             if section_text.strip():
                 chunks.append({
                     "text": section_text,
                     "section_marker": current_marker,
                     "char_count": len(section_text)
                 })
+            
+            # Marcador da nova seção: primeira palavra da linha
+            line_end = text.find('\n', next_start)
+            words = text[next_start:line_end if line_end != -1 else None].split(None, 1)
+            current_marker = words[0] if words else None
+            section_start = next_start
         
         self.logger.info(
             "Section chunking completed",
@@ -186,13 +249,13 @@ class TextChunker:
         Returns:
             Lista de chunks otimizados
         """
-        # Estimativa: ~4 caracteres por token
-        max_chars = max_tokens * 4
-        
         optimized_chunks = []
         
         for chunk in chunks:
-            if chunk["char_count"] <= max_chars:
+            # Estimativa de tokens calculada uma vez e guardada no chunk
+            token_estimate = self._estimate_tokens(chunk["char_count"])
+            if token_estimate <= max_tokens:
+                chunk["token_estimate"] = token_estimate
                 optimized_chunks.append(chunk)
             else:
                 # Dividir chunk muito grande
@@ -203,6 +266,7 @@ class TextChunker:
                     optimized_chunks.append({
                         "text": sub_text,
                         "char_count": len(sub_text),
+                        "token_estimate": self._estimate_tokens(len(sub_text)),
                         "metadata": {
                             **chunk.get("metadata", {}),
                             "split_from_large_chunk": True
@@ -217,6 +281,10 @@ class TextChunker:
         
         return optimized_chunks
     
+    def _estimate_tokens(self, char_count: int) -> int:
+        """Tokens estimados para um texto de char_count caracteres (arredonda para cima)"""
+        return -(-char_count // self.CHARS_PER_TOKEN)
+    
     def add_context_to_chunks(
         self,
         chunks: List[Dict[str, any]],
@@ -288,16 +288,23 @@ class VectorDBService:
                 "error": str(e)
             }
     
-    def list_collections(self) -> List[str]:
+    def list_collections(self, prefix: Optional[str] = None) -> List[str]:
         """
         Lista todas as collections
         
+        Args:
+            prefix: Retorna apenas collections cujo nome começa com o prefixo
+                (o ChromaDB 0.5 não filtra no servidor; o filtro é aplicado
+                na mesma passada que extrai os nomes)
+        
         Returns:
             Lista de nomes de collections
         """
         try:
             self._ensure_connection()
             collections = self.client.list_collections()
+            if prefix:
+                return [c.name for c in collections if c.name.startswith(prefix)]
             return [c.name for c in collections]
             
         except Exception as e:
@@ -0,0 +1,12 @@
+-- =====================================================
+-- MIGRATION: ADD HEADER HASH TO FILE SCHEMAS
+-- Descrição: Permite reutilizar o schema descoberto para
+--            arquivos CSV com cabeçalho idêntico
+-- =====================================================
+
+ALTER TABLE file_schemas
+ADD COLUMN IF NOT EXISTS header_hash VARCHAR(128);
+
+CREATE UNIQUE INDEX IF NOT EXISTS ix_file_schemas_header_hash ON file_schemas(header_hash);
+
+COMMENT ON COLUMN file_schemas.header_hash IS 'BLAKE2b da linha de cabeçalho do CSV';
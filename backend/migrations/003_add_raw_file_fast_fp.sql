@@ -0,0 +1,12 @@
+-- =====================================================
+-- MIGRATION: ADD FAST FINGERPRINT TO RAW FILES
+-- Descrição: Pré-filtro de deduplicação que evita calcular
+--            o SHA256 completo de arquivos já armazenados
+-- =====================================================
+
+ALTER TABLE raw_files
+ADD COLUMN IF NOT EXISTS fast_fp BIGINT;
+
+CREATE INDEX IF NOT EXISTS ix_raw_files_fast_fp ON raw_files(fast_fp);
+
+COMMENT ON COLUMN raw_files.fast_fp IS 'BLAKE2b (64 bits) dos primeiros/últimos 64KB + tamanho do arquivo';
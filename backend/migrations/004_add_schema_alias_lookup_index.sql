@@ -0,0 +1,7 @@
+-- =====================================================
+-- MIGRATION: ADD COMPOSITE LOOKUP INDEX TO SCHEMA ALIASES
+-- Descrição: Atende a busca de colunas por alias filtrada
+--            (ou não) por file_schema_id com um único índice
+-- =====================================================
+
+CREATE INDEX IF NOT EXISTS idx_schema_alias_lookup ON schema_aliases(alias, file_schema_id);
@@ -0,0 +1,14 @@
+-- =====================================================
+-- MIGRATION: STORE SCHEMA ALIAS CONFIDENCE AS FLOAT
+-- Descrição: confidence passa de texto ("0.95") para número,
+--            permitindo ORDER BY nativo sem conversão por linha
+-- =====================================================
+
+ALTER TABLE schema_aliases
+ALTER COLUMN confidence DROP DEFAULT;
+
+ALTER TABLE schema_aliases
+ALTER COLUMN confidence TYPE DOUBLE PRECISION USING confidence::double precision;
+
+ALTER TABLE schema_aliases
+ALTER COLUMN confidence SET DEFAULT 1.0;
@@ -0,0 +1,8 @@
+-- =====================================================
+-- MIGRATION: STORE PORTAL INGESTION JOB PACKAGES AS JSON
+-- Descrição: packages passa de texto serializado para JSON,
+--            para que o driver devolva a lista já decodificada
+-- =====================================================
+
+ALTER TABLE portal_ingestion_jobs
+ALTER COLUMN packages TYPE JSON USING packages::json;
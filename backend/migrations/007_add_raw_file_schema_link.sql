@@ -0,0 +1,35 @@
+-- =====================================================
+-- MIGRATION: LINK RAW FILES TO THEIR (SHARED) SCHEMA
+-- Descrição: Arquivos com cabeçalho idêntico reutilizam o mesmo
+--            FileSchema; raw_files.file_schema_id registra essa
+--            associação. header_hash passa a ser único apenas
+--            entre schemas ativos.
+-- =====================================================
+
+ALTER TABLE raw_files
+ADD COLUMN IF NOT EXISTS file_schema_id VARCHAR;
+
+ALTER TABLE raw_files
+DROP CONSTRAINT IF EXISTS fk_raw_files_file_schema_id;
+
+ALTER TABLE raw_files
+ADD CONSTRAINT fk_raw_files_file_schema_id
+FOREIGN KEY (file_schema_id) REFERENCES file_schemas(id);
+
+CREATE INDEX IF NOT EXISTS ix_raw_files_file_schema_id ON raw_files(file_schema_id);
+
+-- Arquivos que originaram um schema
+UPDATE raw_files rf
+SET file_schema_id = fs.id
+FROM file_schemas fs
+WHERE fs.raw_file_id = rf.id
+  AND fs.status = 'active'
+  AND rf.file_schema_id IS NULL;
+
+DROP INDEX IF EXISTS ix_file_schemas_header_hash;
+
+CREATE UNIQUE INDEX IF NOT EXISTS ix_file_schemas_header_hash
+ON file_schemas(header_hash)
+WHERE status = 'active';
+
+COMMENT ON COLUMN raw_files.file_schema_id IS 'FileSchema usado pelo arquivo (próprio ou reutilizado pelo header_hash)';
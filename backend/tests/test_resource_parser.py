@@ -0,0 +1,32 @@
+"""
+Testes do parse de CSV do ResourceParser
+"""
+import unittest
+
+from app.services.resource_parser import ResourceParser
+
+
+class ParseCsvBomTest(unittest.TestCase):
+    """CSV UTF-8 com BOM (comum nos arquivos do Portal)"""
+    
+    CONTENT = b'\xef\xbb\xbfid;nome;valor\n1;A;10\n2;B;20\n'
+    EXPECTED_FIELDS = [
+        {"id": "1", "nome": "A", "valor": "10"},
+        {"id": "2", "nome": "B", "valor": "20"},
+    ]
+    
+    def test_parse_csv_bytes_strips_bom_and_keeps_strings(self):
+        docs = ResourceParser().parse_csv_bytes(self.CONTENT, "bom.csv")
+        self.assertEqual([doc["fields"] for doc in docs], self.EXPECTED_FIELDS)
+    
+    def test_parse_csv_str_strips_bom(self):
+        docs = ResourceParser().parse_csv(self.CONTENT.decode("utf-8"), "bom.csv")
+        self.assertEqual([doc["fields"] for doc in docs], self.EXPECTED_FIELDS)
+    
+    def test_python_fallback_strips_bom(self):
+        docs = list(ResourceParser()._iter_csv_python(self.CONTENT.decode("utf-8"), "bom.csv"))
+        self.assertEqual([doc["fields"] for doc in docs], self.EXPECTED_FIELDS)
+
+
+if __name__ == "__main__":
+    unittest.main()